@@ -16,460 +16,973 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
+import collections
+import concurrent.futures
+import fnmatch
+import functools
+import hashlib
+import io
+import json
+import mmap
 import os
+import shutil
 import struct
+import sys
+import tempfile
+import threading
+import time
 import zlib
 
+import arc_container
+import arc_types
 
-file_types = [
-    # Monster Hunter 4 Ultimate file types
-    ['rArchive', 'arc'],
-    ['rCameraList', 'lcm'],
-    ['rChainCol', 'ccl'],
-    ['rCnsTinyChain', 'ctc'],
-    ['rCollision', 'sbc'],
-    ['rEffectAnim', 'ean'],
-    ['rEffectList', 'efl'],
-    ['rEnemyCmd', 'emc'],
-    ['rEnemyData', 'emd'],
-    ['rEnemyTuneData', 'etd'],
-    ['rEventActorTbl', 'evt'],
-    ['rGrass2', 'gr2'],
-    ['rGrass2Setting', 'gr2s'],
-    ['rGrassWind', 'grw'],
-    ['rItemPopList', 'ipl'],
-    ['rItemPopSet', 'ips'],
-    ['rLayout', 'lyt'],
-    ['rLayoutAnimeList', 'lanl'],
-    ['rLayoutFont', 'lfd'],
-    ['rLayoutMessage', 'lmd'],
-    ['rLtProceduralTexture', 'ptex'],
-    ['rLtShader', 'lfx'],
-    ['rLtSoundBank', 'sbk'],
-    ['rLtSoundCategoryFilter', 'cfl'],
-    ['rLtSoundRequest', 'srq'],
-    ['rLtSoundReverb', 'rev_ctr'],
-    ['rLtSoundSourceADPCM', 'mca'],
-    ['rLtSoundStreamRequest', 'stq'],
-    ['rMHSoundEmitter', 'ses'],
-    ['rMHSoundSequence', 'mss'],
-    ['rMaterial', 'mrl'],
-    ['rMhMotionEffect', 'mef'],
-    ['rModel', 'mod'],
-    ['rMotionList', 'lmt'],
-    ['rMovieOnDisk', 'moflex'],
-    ['rQuestData', 'mib'],
-    ['rScheduler', 'sdl'],
-    ['rSoundAttributeSe', 'ase'],
-    ['rSoundCurveSet', 'scs'],
-    ['rSoundDirectionalSet', 'sds'],
-    ['rStageAreaInfo', 'sai'],
-    ['rStageCameraData', 'scd'],
-    ['rStageInfoSet', 'sis'],
-    ['rSwkbdMessageStyleTable', 'skst'],
-    ['rSwkbdMessageTable', 'skmt'],
-    ['rSwkbdSubGroup', 'sksg'],
-    ['rTexture', 'tex'],
-    # Monster Hunter X demo file types
-    ['rAIWayPoint', 'way'],
-    ['rActivityData', 'atd'],
-    ['rAmuletData', 'amlt'],
-    ['rAmuletSkillData', 'amskl'],
-    ['rAmuletSlotData', 'amslt'],
-    ['rAngryParam', 'angryprm'],
-    ['rAreaActTblData', 'areaacttbl'],
-    ['rAreaCommonLink', 'areacmnlink'],
-    ['rAreaEatData', 'areaeatdat'],
-    ['rAreaInfo', 'areainfo'],
-    ['rAreaLinkData', 'arealinkdat'],
-    ['rAreaPatrolData', 'areapatrol'],
-    ['rAreaSelectData', 'areaseldat'],
-    ['rArmorBuildData', 'abd'],
-    ['rArmorColorData', 'acd'],
-    ['rArmorResistData', 'ard'],
-    ['rArmorSeData', 'ased'],
-    ['rArmorSeriesData', 'asd'],
-    ['rBodyData', 'bdd'],
-    ['rBowgunShellData', 'bgsd'],
-    ['rCommonScript', 'cms'],
-    ['rDecoData', 'deco'],
-    ['rEmDouMouKaData', 'mdd'],
-    ['rEmSetList', 'esl'],
-    ['rEmSizeCalcTblElement', 'emsizetbl'],
-    ['rEmSizeYureTbl', 'emyure'],
-    ['rEnemyDtBase', 'dtb'],
-    ['rEnemyDtBaseParts', 'dtp'],
-    ['rEnemyDtTune', 'dtt'],
-    ['rEnemyNandoData', 'nan'],
-    ['rEnemyResidentDtBase', 'rdb'],
-    ['rEquipBaseColorData', 'ebcd'],
-    ['rFestaPelTiedSe', 'pts'],
-    ['rFestaResourceList', 'frl'],
-    ['rFestaSoundEmitter', 'ses'],
-    ['rFestaSoundSequence', 'mss'],
-    ['rFishData', 'fsh'],
-    ['rFreeUseParam', 'fup'],
-    ['rFueMusicData', 'fmt'],
-    ['rFueMusicInfData', 'fmi'],
-    ['rFueMusicScData', 'fms'],
-    ['rGUI', 'gui'],
-    ['rGUIFont', 'gfd'],
-    ['rGUIIconInfo', 'gii'],
-    ['rGUIMessage', 'gmd'],
-    ['rHagi', 'hgi'],
-    ['rHitDataEnemy', 'hde'],
-    ['rHitDataPlayer', 'hdp'],
-    ['rHitDataShell', 'hds'],
-    ['rHitSize', 'hts'],
-    ['rHunterArtsData', 'hta'],
-    ['rInsectAbirity', 'insectabirity'],
-    ['rInsectAttr', 'isa'],
-    ['rInsectData', 'isd'],
-    ['rInsectEssenceSkill', 'insectessenceskill'],
-    ['rInsectLevel', 'isl'],
-    ['rInsectParam', 'isp'],
-    ['rItemData', 'itm'],
-    ['rItemPreData', 'itp'],
-    ['rItemPreTypeData', 'ipt'],
-    ['rKireajiData', 'kad'],
-    ['rKowareObjData', 'kod'],
-    ['rLayoutAnime', 'lan'],
-    ['rMapTimeData', 'maptime'],
-    ['rMonsterPartsManager', 'mpm'],
-    ['rOtArmorData', 'oar'],
-    ['rOtLevel', 'olvl'],
-    ['rOtMessageLot', 'otml'],
-    ['rOtQuestExpBias', 'oxpb'],
-    ['rOtQuestExpValue', 'oxpv'],
-    ['rOtSkill', 'oskl'],
-    ['rOtSpecialAction', 'osa'],
-    ['rOtSupportActionBase', 'sab'],
-    ['rOtSupportActionOtUnique', 'saou'],
-    ['rOtTensionData', 'otd'],
-    ['rOtTrainParam', 'otp'],
-    ['rOtWeaponData', 'owp'],
-    ['rPlBaseCmd', 'plbasecmd'],
-    ['rPlCmdTblList', 'plcmdtbllist'],
-    ['rPlayerGimmickType', 'plgmktype'],
-    ['rPlayerManyAttacks', 'pma'],
-    ['rPlayerPartsDisp', 'plpartsdisp'],
-    ['rPlayerWeaponList', 'plweplist'],
-    ['rPointPos', 'pntpos'],
-    ['rProofEffectColorControl', 'pec'],
-    ['rProofEffectList', 'pel'],
-    ['rProofEffectMotSequenceList', 'psl'],
-    ['rProofEffectParamScript', 'pep'],
-    ['rQuestGroup', 'qsg'],
-    ['rRapidshotData', 'raps'],
-    ['rRelationData', 'rlt'],
-    ['rRem', 'rem'],
-    ['rSeFsAse', 'sfsa'],
-    ['rSetEmMain', 'sem'],
-    ['rSetItemData', 'sid'],
-    ['rShell', 'shell'],
-    ['rShellEffectParam', 'sep'],
-    ['rSkillData', 'skd'],
-    ['rSkillTypeData', 'skt'],
-    ['rSoundBank', 'sbkr'],
-    ['rSoundEQ', 'equr'],
-    ['rSoundRequest', 'srqr'],
-    ['rSoundReverb', 'revr_ctr'],
-    ['rSoundSourceADPCM', 'mca'],
-    ['rSoundStreamRequest', 'stqr'],
-    ['rSquatshotData', 'squs'],
-    ['rSupplyList', 'sup'],
-    ['rSupportGaugeValue', 'spval'],
-    ['rTameshotData', 'tams'],
-    ['rWeapon00BaseData', 'w00d'],
-    ['rWeapon00LevelData', 'w00d'],
-    ['rWeapon00MsgData', 'w00m'],
-    ['rWeapon01BaseData', 'w01d'],
-    ['rWeapon01LevelData', 'w01d'],
-    ['rWeapon01MsgData', 'w01m'],
-    ['rWeapon02BaseData', 'w02d'],
-    ['rWeapon02LevelData', 'w02d'],
-    ['rWeapon02MsgData', 'w02m'],
-    ['rWeapon03BaseData', 'w03d'],
-    ['rWeapon03LevelData', 'w03d'],
-    ['rWeapon03MsgData', 'w03m'],
-    ['rWeapon04BaseData', 'w04d'],
-    ['rWeapon04LevelData', 'w04d'],
-    ['rWeapon04MsgData', 'w04m'],
-    ['rWeapon06BaseData', 'w06d'],
-    ['rWeapon06LevelData', 'w06d'],
-    ['rWeapon06MsgData', 'w06m'],
-    ['rWeapon07BaseData', 'w07d'],
-    ['rWeapon07LevelData', 'w07d'],
-    ['rWeapon07MsgData', 'w07m'],
-    ['rWeapon08BaseData', 'w08d'],
-    ['rWeapon08LevelData', 'w08d'],
-    ['rWeapon08MsgData', 'w08m'],
-    ['rWeapon09BaseData', 'w09d'],
-    ['rWeapon09LevelData', 'w09d'],
-    ['rWeapon09MsgData', 'w09m'],
-    ['rWeapon10BaseData', 'w10d'],
-    ['rWeapon10LevelData', 'w10d'],
-    ['rWeapon10MsgData', 'w10m'],
-    ['rWeapon11BaseData', 'w11d'],
-    ['rWeapon11LevelData', 'w11d'],
-    ['rWeapon11MsgData', 'w11m'],
-    ['rWeapon12BaseData', 'w12d'],
-    ['rWeapon12LevelData', 'w12d'],
-    ['rWeapon12MsgData', 'w12m'],
-    ['rWeapon13BaseData', 'w13d'],
-    ['rWeapon13LevelData', 'w13d'],
-    ['rWeapon13MsgData', 'w13m'],
-    ['rWeapon14BaseData', 'w14d'],
-    ['rWeapon14LevelData', 'w14d'],
-    ['rWeapon14MsgData', 'w14m'],
-    # Monster Hunter X file types
-    ['rAcNyanterEquip', 'ane'],
-    ['rAcPlayerEquip', 'ape'],
-    ['rAreaConnect', 'acn'],
-    ['rArmorCreateData', 'arcd'],
-    ['rArmorProcessData', 'apd'],
-    ['rBui', 'bui'],
-    ['rCatSkillData', 'cskd'],
-    ['rDLCOtomoInfo', 'doi'],
-    ['rDecoCreateData', 'dcd'],
-    ['rEquipShopListA00', 'sla00'],
-    ['rEquipShopListW00', 'slw00'],
-    ['rEquipShopListW01', 'slw01'],
-    ['rEquipShopListW02', 'slw02'],
-    ['rEquipShopListW03', 'slw03'],
-    ['rEquipShopListW04', 'slw04'],
-    ['rEquipShopListW06', 'slw06'],
-    ['rEquipShopListW07', 'slw07'],
-    ['rEquipShopListW08', 'slw08'],
-    ['rEquipShopListW09', 'slw09'],
-    ['rEquipShopListW10', 'slw10'],
-    ['rEquipShopListW11', 'slw11'],
-    ['rEquipShopListW12', 'slw12'],
-    ['rEquipShopListW13', 'slw13'],
-    ['rEquipShopListW14', 'slw14'],
-    ['rFloorLvData', 'fld'],
-    ['rFreeHuntData', 'fht'],
-    ['rGeyserPointData', 'gpd'],
-    ['rGuestEffectiveAttr', 'atr'],
-    ['rGuestQuestData', 'mib'],
-    ['rGuestRemData', 'rem'],
-    ['rInsectAttrFeed', 'iaf'],
-    ['rInsectGrowFeed', 'igf'],
-    ['rItemCategoryTypeData', 'ict'],
-    ['rKitchenListGrillItem', 'kcg'],
-    ['rKitchenListMenu', 'kcm'],
-    ['rKitchenListSkillAlcohol', 'kca'],
-    ['rKitchenListSkillRandom', 'kcr'],
-    ['rKitchenListSkillSet', 'kcs'],
-    ['rKitchenListSuccessTable1', 'kc1'],
-    ['rKitchenListSuccessTable2', 'kc2'],
-    ['rKitchenListSuccessTable3', 'kc3'],
-    ['rMonNyanAdventItem', 'mai'],
-    ['rMonNyanCirclePattern', 'mcn'],
-    ['rMonNyanCommonMaterial', 'mcm'],
-    ['rMonNyanExp', 'mex'],
-    ['rMonNyanLotAdvent', 'mla'],
-    ['rMonNyanLotCommon', 'mlc'],
-    ['rMonNyanLotEnemy', 'mle'],
-    ['rMonNyanReward', 'mri'],
-    ['rMonNyanRewardEnemy', 'mre'],
-    ['rMonNyanRewardSecret', 'mrs'],
-    ['rMonNyanVillagePoint', 'mvp'],
-    ['rNpcBaseData', 'npcBd'],
-    ['rNpcBaseData_ID', 'npcId'],
-    ['rNpcBaseData_Mdl', 'npcMdl'],
-    ['rNpcInitScript', 'nis'],
-    ['rNpcLocateData', 'nld'],
-    ['rNpcMoveData', 'npcMd'],
-    ['rNpcSubData', 'npcSd'],
-    ['rNpcTalkData', 'ntd'],
-    ['rOtEquipCreate', 'oec'],
-    ['rOtIniLot', 'otil'],
-    ['rOtLotOwnSkill', 'olsk'],
-    ['rOtLotOwnSupport', 'olos'],
-    ['rOtParamLot', 'opl'],
-    ['rOtPointTable', 'otpt'],
-    ['rPieceCreateList', 'pcl'],
-    ['rSansaijijiExchange', 'ssjje'],
-    ['rSansaijijiPresent', 'ssjjp'],
-    ['rShopList', 'slt'],
-    ['rShopListSale', 'sls'],
-    ['rSpActData', 'sad'],
-    ['rTradeDeliveryList', 'trdl'],
-    ['rTradeItemList', 'tril'],
-    ['rTradeLimitedItemList', 'tlil'],
-    ['rTradeLotList', 'trll'],
-    ['rTradePointItemList', 'tpil'],
-    ['rTutorialCylinderData', 'tucyl'],
-    ['rTutorialFlowData', 'tuto'],
-    ['rVillageFirstPos', 'vfp'],
-    ['rWeaponCreateData', 'wcd'],
-    ['rWeaponProcessData', 'wpd'],
-    # Monster Hunter XX file types
-    #['rAIDynamicLayout', ''],
-    #['rAIPathBase', ''],
-    #['rAIPathBaseXml', ''],
-    #['rAIWayPointGraph', ''],
-    #['rActParam', ''],
-    #['rActionUseParam', ''],
-    ['rAlchemyData', 'alc'],
-    ['rAngleLimitData', 'AngleLimit'],
-    #['rChain', ''],
-    #['rCnsIK', ''],
-    #['rCnsJointOffset', ''],
-    #['rCnsMatrix', ''],
-    #['rCnsTinyIK', ''],
-    ['rCoinTradeList', 'ctl'],
-    #['rCollisionHeightField', ''],
-    #['rCollisionObj', ''],
-    #['rConstraint', ''],
-    #['rConvexHull', ''],
-    #['rDLCItemPackInfo', ''],
-    #['rDLCUpdateInfo', ''],
-    #['rDebugActionData', ''],
-    #['rDebugAtkActSet', ''],
-    #['rDebugAtkActSet', ''],
-    #['rEffect2D', ''],
-    #['rEffectStrip', ''],
-    #['rEmSetData', ''],
-    #['rEnemyDataTable', ''],
-    #['rEnemyDebugSetData', ''],
-    #['rFestaResource', ''],
-    #['rGeometry2', ''],
-    #['rGeometry2', ''],
-    #['rGeometry2Group', ''],
-    #['rGeometry3', ''],
-    #['rGrass', ''],
-    #['rMovie', ''],
-    #['rMovieOnMemory', ''],
-    #['rNavigationMesh', ''],
-    #['rNulls', ''],
-    #['rOtodokeConditionList', ''],
-    ['rOtodokeSetList', 'ots'],
-    #['rPastQuestGroup', ''],
-    #['rPlayerDummyAction', ''],
-    ['rQuestDaily', 'qdm'],
-    ['rQuestLink', 'qdl'],
-    ['rQuestPlus', 'qdp'],
-    #['rRenderTargetTexture', ''],
-    ['rResearchReinforce', 'ots'],
-    #['rResourceSample', ''],
-    #['rSoundSource', ''],
-    #['rSoundSourceWav', ''],
-    #['rTrialArts', ''],
-    #['rTrialBowBottle', ''],
-    #['rTrialBowShot', ''],
-    #['rTrialDataCommon', ''],
-    #['rTrialDataNyanter', ''],
-    #['rTrialEquipData', ''],
-    #['rTrialEquipOtomo', ''],
-    #['rTrialEquipParam', ''],
-    #['rTrialHeavyBowgunData', ''],
-    #['rTrialItemPoach', ''],
-    #['rTrialLightBowgun', ''],
-    #['rTrialLoadShellCount', ''],
-    #['rTrialOtomoParam', ''],
-    #['rVertices', ''],
-    #['rVibration', ''],
-    #['rVramLoadList', '']
-]
-
-def gen_file_type_codes():
-    return [(zlib.crc32(file_type[0].encode()) ^ 0xffffffff) & 0x7fffffff for file_type in file_types]
-
-def extract_arc(arc_file, output_path, file_list):
-    if not os.path.isdir(output_path):
-        raise ValueError('output path: must be existing directory')
-    arc = open(arc_file, 'rb')
-    magic, version, file_count, unknown = struct.unpack('4sHHI', arc.read(12))
+
+compression_profiles = {
+    # name: (zlib level, zlib memLevel)
+    'fast': (1, 8),
+    'default': (6, 8),
+    'max': (9, 9)
+}
+
+ArcEntry = collections.namedtuple('ArcEntry', ['name', 'file_name', 'file_type', 'file_type_code', 'compressed_size', 'size', 'offset', 'flags'])
+
+def read_header(header):
+    magic, version, file_count, unknown = struct.unpack('4sHHI', header)
     if magic != b'ARC\x00':
         raise ValueError('header: invalid magic')
     if version not in [0x13, 0x11]: # 0x13 = MH4U, 0x11 = MHX
         raise ValueError('header: invalid version')
-    file_type_codes = gen_file_type_codes()
-    toc = arc.read(file_count * 0x50)
-    if file_list:
-        file_list = open(file_list, 'w')
+    return version, file_count
+
+def get_size_mask(version):
+    if version == 0x13:
+        return 0x0fffffff
+    return 0x1fffffff
+
+def read_toc(toc, version, file_count):
+    entries = []
     for i in range(file_count):
-        file_name, file_type_code, compressed_size, size, offset = struct.unpack('64sIIII', toc[i*0x50:(i+1)*0x50])
-        file_type = 'UNKNOWN'
-        file_extension = '{:08X}'.format(file_type_code)
-        if file_type_code in file_type_codes:
-            file_type, file_extension = file_types[file_type_codes.index(file_type_code)]
-        file_name = os.path.join(*file_name.decode().strip('\x00').split('\\')) + '.' + file_extension
-        if file_list:
-            file_list.write(file_name + '\n')
-        if version == 0x13:
-            size &= 0x0fffffff
+        file_name, file_type_code, compressed_size, size, offset = struct.unpack_from('64sIIII', toc, i*0x50)
+        file_type, file_extension = arc_types.get_file_type(file_type_code)
+        name = file_name.decode().strip('\x00') + '.' + file_extension
+        file_name = os.path.join(*name.split('\\'))
+        flags = size & ~get_size_mask(version)
+        size &= get_size_mask(version)
+        entries.append(ArcEntry(name, file_name, file_type, file_type_code, compressed_size, size, offset, flags))
+    return entries
+
+def inflate_entry(entry, file_data):
+    if len(file_data) != entry.compressed_size:
+        raise ValueError('table of contents: wrong compressed file size')
+    if entry.compressed_size == entry.size: # stored without compression
+        return file_data
+    file_data = zlib.decompress(file_data)
+    if len(file_data) != entry.size:
+        raise ValueError('table of contents: wrong file size')
+    return file_data
+
+class ArcEntryFile(io.RawIOBase):
+    def __init__(self, entry, data):
+        self._entry = entry
+        self._data = data
+        self._decompressor = zlib.decompressobj()
+        self._position = entry.offset
+        self._size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buff):
+        if self._entry.compressed_size == self._entry.size: # stored without compression
+            end = self._entry.offset + self._entry.compressed_size
+            data = self._data[self._position:min(self._position+len(buff), end)]
+            self._position += len(data)
+            if len(data) == 0 and self._position != end:
+                raise ValueError('table of contents: wrong compressed file size')
+            buff[:len(data)] = data
+            return len(data)
+        data = b''
+        while len(data) == 0 and not self._decompressor.eof:
+            chunk = self._decompressor.unconsumed_tail
+            if len(chunk) == 0:
+                end = self._entry.offset + self._entry.compressed_size
+                chunk = self._data[self._position:min(self._position+0x10000, end)]
+                self._position += len(chunk)
+                if len(chunk) == 0:
+                    raise ValueError('table of contents: wrong compressed file size')
+            data = self._decompressor.decompress(chunk, len(buff))
+        self._size += len(data)
+        if self._decompressor.eof and self._size != self._entry.size:
+            raise ValueError('table of contents: wrong file size')
+        buff[:len(data)] = data
+        return len(data)
+
+class ArcReader:
+    def __init__(self, arc_file):
+        if isinstance(arc_file, (bytes, bytearray, memoryview)):
+            self._file = None
+            self._data = memoryview(arc_file)
         else:
-            size &= 0x1fffffff
-        print('extracting: {}, type: {}, compressed size: {}, size: {}'.format(file_name, file_type, compressed_size, size))
-        arc.seek(offset)
-        file_data = arc.read(compressed_size)
-        if len(file_data) != compressed_size:
+            self._file = open(arc_file, 'rb')
+            try:
+                self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self._file.close()
+                raise ValueError('header: invalid magic')
+        if len(self._data) < 12:
+            self.close()
+            raise ValueError('header: invalid magic')
+        try:
+            self.version, file_count = read_header(self._data[:12])
+        except ValueError:
+            self.close()
+            raise
+        if len(self._data) < file_count * 0x50 + 12:
+            self.close()
+            raise ValueError('table of contents: wrong file count')
+        self.entries = read_toc(self._data[12:file_count*0x50+12], self.version, file_count)
+        self.index = {entry.name: entry for entry in self.entries}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name.replace('/', '\\') in self.index
+
+    def close(self):
+        if self._file is not None:
+            self._data.close()
+            self._file.close()
+
+    def get_entry(self, name):
+        entry = self.index.get(name.replace('/', '\\'))
+        if entry is None:
+            raise KeyError('entry not found: {}'.format(name))
+        return entry
+
+    def read_raw(self, name):
+        entry = self.get_entry(name)
+        return self._data[entry.offset:entry.offset+entry.compressed_size]
+
+    def read_raw_entry(self, entry):
+        return self._data[entry.offset:entry.offset+entry.compressed_size]
+
+    def read_entry(self, entry, stats=None):
+        if stats is None:
+            return inflate_entry(entry, self._data[entry.offset:entry.offset+entry.compressed_size])
+        start = time.perf_counter()
+        file_data = self._data[entry.offset:entry.offset+entry.compressed_size]
+        read_time = time.perf_counter()
+        file_data = inflate_entry(entry, file_data)
+        stats.add_time('read', read_time - start)
+        stats.add_time('inflate', time.perf_counter() - read_time)
+        return file_data
+
+    def read(self, name):
+        return self.read_entry(self.get_entry(name))
+
+    def open(self, name):
+        entry = self.get_entry(name)
+        if entry.offset + entry.compressed_size > len(self._data):
             raise ValueError('table of contents: wrong compressed file size')
-        file_data = zlib.decompress(file_data)
-        if len(file_data) != size:
-            raise ValueError('table of contents: wrong file size')
-        file_name = os.path.join(output_path, file_name)
-        os.makedirs(os.path.dirname(file_name), exist_ok=True)
-        open(file_name, 'wb').write(file_data)
+        return io.BufferedReader(ArcEntryFile(entry, self._data))
+
+def parallel_map(function, items, jobs=1):
+    if jobs <= 1:
+        for item in items:
+            yield function(item)
+        return
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while len(pending) != 0:
+            yield pending.popleft().result()
+
+def inflate_entries(arc, entries, jobs=1, stats=None):
+    return zip(entries, parallel_map(functools.partial(arc.read_entry, stats=stats), entries, jobs))
+
+class ArcStats:
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.start_time = time.perf_counter()
+        self.stage_times = {'toc': 0.0, 'read': 0.0, 'inflate': 0.0, 'write': 0.0}
+        self.total_entries = 0
+        self.entries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, elapsed):
+        with self._lock:
+            self.stage_times[stage] += elapsed
+
+    def add_entry(self, name, entry):
+        self.entries += 1
+        self.bytes_in += entry.compressed_size
+        self.bytes_out += entry.size
+        if self.callback is not None:
+            self.callback(self, name, entry)
+
+    def get_elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def get_entries_per_second(self):
+        return self.entries / max(self.get_elapsed(), 1e-9)
+
+    def get_metrics(self):
+        elapsed = self.get_elapsed()
+        return {
+            'elapsed': elapsed,
+            'stage_times': dict(self.stage_times),
+            'entries': self.entries,
+            'total_entries': self.total_entries,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'entries_per_second': self.entries / max(elapsed, 1e-9),
+            'bytes_out_per_second': self.bytes_out / max(elapsed, 1e-9)
+        }
+
+def print_entry(stats, name, entry):
+    print('extracting: {}, type: {}, compressed size: {}, size: {}'.format(os.path.join(*name.split('/')), entry.file_type, entry.compressed_size, entry.size))
+
+class ProgressPrinter:
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self._last_time = 0.0
+
+    def __call__(self, stats, name, entry):
+        if time.perf_counter() - self._last_time >= self.interval:
+            self.print_progress(stats)
+
+    def print_progress(self, stats, end=''):
+        self._last_time = time.perf_counter()
+        sys.stderr.write('\rextracted: {}/{}, {:.1f} entries/s, {:.1f} MB/s{}'.format(stats.entries, stats.total_entries, stats.get_entries_per_second(), stats.bytes_out / 0x100000 / max(stats.get_elapsed(), 1e-9), end))
+        sys.stderr.flush()
+
+def match_type(entry, file_type):
+    if file_type in (entry.file_type, entry.file_name.rsplit('.', 1)[-1]):
+        return True
+    try:
+        return int(file_type, 16) == entry.file_type_code
+    except ValueError:
+        return False
+
+def select_entries(entries, include=None, exclude=None, types=None):
+    selected = []
+    for entry in entries:
+        name = entry.name.replace('\\', '/')
+        if include and not any(fnmatch.fnmatchcase(name, pattern) for pattern in include):
+            continue
+        if exclude and any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude):
+            continue
+        if types and not any(match_type(entry, file_type) for file_type in types):
+            continue
+        selected.append(entry)
+    return selected
+
+def extract_entry(writer, entry, name, file_data, max_depth=0, memory_budget=0, stats=None):
+    start = time.perf_counter()
+    writer.write(name, file_data)
+    stats.add_time('write', time.perf_counter() - start)
+    stats.add_entry(name, entry)
+    if max_depth <= 0 or entry.file_type != 'rArchive' or len(file_data) > memory_budget:
+        return
+    start = time.perf_counter()
+    try:
+        arc = ArcReader(file_data)
+    except ValueError:
+        return
+    stats.add_time('toc', time.perf_counter() - start)
+    stats.total_entries += len(arc.entries)
+    name = name.rsplit('.', 1)[0] + '/'
+    for nested_entry in arc.entries:
+        extract_entry(writer, nested_entry, name + nested_entry.name.replace('\\', '/'), arc.read_entry(nested_entry, stats), max_depth - 1, memory_budget - len(file_data), stats)
+
+def extract_arc(arc_file, output_path, file_list, jobs=1, include=None, exclude=None, types=None, output_format='dir', max_depth=0, memory_budget=0x10000000, stats=None):
+    if stats is None:
+        stats = ArcStats(print_entry)
+    writer = arc_container.open_writer(output_format, output_path)
+    start = time.perf_counter()
+    arc = ArcReader(arc_file)
+    entries = select_entries(arc.entries, include, exclude, types)
+    stats.add_time('toc', time.perf_counter() - start)
+    stats.total_entries += len(entries)
+    if file_list:
+        file_list = open(file_list, 'w')
+    for entry, file_data in inflate_entries(arc, entries, jobs, stats):
+        if file_list:
+            file_list.write(entry.file_name + '\n')
+        extract_entry(writer, entry, entry.name.replace('\\', '/'), file_data, max_depth, memory_budget, stats)
+    if file_list:
+        file_list.close()
     arc.close()
+    writer.close()
+    return stats
+
+class CompressionCache:
+    def __init__(self, path, max_size=0x40000000):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_key(self, file_data, profile='default'):
+        return '{}-{}-{}'.format(hashlib.sha1(file_data).hexdigest(), *compression_profiles[profile])
 
-def create_arc(arc_file, input_files):
+    def get_file_key(self, input_file, profile='default', chunk_size=0x100000):
+        file_hash = hashlib.sha1()
+        with open(input_file, 'rb') as input:
+            while True:
+                file_data = input.read(chunk_size)
+                if len(file_data) == 0:
+                    break
+                file_hash.update(file_data)
+        return '{}-{}-{}'.format(file_hash.hexdigest(), *compression_profiles[profile])
+
+    def _get_path(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def open(self, key):
+        try:
+            cached = open(self._get_path(key), 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(self._get_path(key))
+        with self._lock:
+            self.hits += 1
+        return cached
+
+    def create(self, key):
+        os.makedirs(os.path.dirname(self._get_path(key)), exist_ok=True)
+        return open('{}.{}.{}.tmp'.format(self._get_path(key), os.getpid(), threading.get_ident()), 'wb')
+
+    def commit(self, key, cached):
+        cached.close()
+        os.replace(cached.name, self._get_path(key))
+
+    def compress(self, file_data, profile='default'):
+        key = self.get_key(file_data, profile)
+        cached = self.open(key)
+        if cached is not None:
+            with cached:
+                return cached.read()
+        file_data = deflate(file_data, profile)
+        cached = self.create(key)
+        cached.write(file_data)
+        self.commit(key, cached)
+        return file_data
+
+    def trim(self):
+        cached_files = []
+        total_size = 0
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for file_name in filenames:
+                if file_name.endswith('.tmp'):
+                    continue
+                file_name = os.path.join(dirpath, file_name)
+                stat = os.stat(file_name)
+                cached_files.append((stat.st_mtime, stat.st_size, file_name))
+                total_size += stat.st_size
+        cached_files.sort()
+        for mtime, size, file_name in cached_files:
+            if total_size <= self.max_size:
+                break
+            os.remove(file_name)
+            total_size -= size
+
+def deflate(file_data, profile='default'):
+    level, mem_level = compression_profiles[profile]
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, mem_level)
+    return compressor.compress(file_data) + compressor.flush()
+
+def should_store(size, compressed_size, store_threshold=None, align=1):
+    if size % align != 0:
+        return False
+    compressed_size += -compressed_size % align
+    if compressed_size == size:
+        return True
+    return store_threshold is not None and compressed_size > size * (1 - store_threshold)
+
+def compress_file(input_file, cache=None, profile='default', store_threshold=None, cipher=None):
+    file_data = open(input_file, 'rb').read()
+    if cache is not None:
+        compressed_data = cache.compress(file_data, profile)
+    else:
+        compressed_data = deflate(file_data, profile)
+    if cipher is None:
+        if should_store(len(file_data), len(compressed_data), store_threshold):
+            return len(file_data), file_data
+        return len(file_data), compressed_data
+    if should_store(len(file_data), len(compressed_data), store_threshold, 8):
+        compressed_data = file_data
+    return len(file_data), cipher.encrypt(compressed_data + bytes(-len(compressed_data) % 8))
+
+def copy_stream(input, arc, chunk_size=0x100000):
+    size = 0
+    while True:
+        file_data = input.read(chunk_size)
+        if len(file_data) == 0:
+            break
+        arc.write(file_data)
+        size += len(file_data)
+    return size
+
+def compress_stream(input_file, arc, chunk_size=0x100000, cache=None, profile='default', store_threshold=None, align=1):
+    if cache is not None:
+        key = cache.get_file_key(input_file, profile, chunk_size)
+        cached = cache.open(key)
+        if cached is not None:
+            with cached:
+                size = os.path.getsize(input_file)
+                if should_store(size, os.fstat(cached.fileno()).st_size, store_threshold, align):
+                    with open(input_file, 'rb') as input:
+                        return size, copy_stream(input, arc, chunk_size)
+                return size, copy_stream(cached, arc, chunk_size)
+        cached = cache.create(key)
+    level, mem_level = compression_profiles[profile]
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, mem_level)
+    file_data_pos = arc.tell()
+    size = 0
+    compressed_size = 0
+    with open(input_file, 'rb') as input:
+        while True:
+            file_data = input.read(chunk_size)
+            if len(file_data) == 0:
+                break
+            size += len(file_data)
+            file_data = compressor.compress(file_data)
+            arc.write(file_data)
+            if cache is not None:
+                cached.write(file_data)
+            compressed_size += len(file_data)
+        file_data = compressor.flush()
+        arc.write(file_data)
+        compressed_size += len(file_data)
+        if cache is not None:
+            cached.write(file_data)
+            cache.commit(key, cached)
+        if should_store(size, compressed_size, store_threshold, align):
+            input.seek(0)
+            arc.seek(file_data_pos)
+            compressed_size = copy_stream(input, arc, chunk_size)
+            arc.truncate()
+    return size, compressed_size
+
+def create_arc(arc_file, input_files, jobs=1, stream=False, cache=None, profile='default', store_threshold=None, game=None, key=None):
+    magic = b'ARC\x00'
+    cipher = None
+    if key is not None:
+        import arcc
+        magic = b'ARCC'
+        cipher = arcc.ArccCipher(key)
     arc = open(arc_file, 'wb')
-    arc.write(struct.pack('4sHHI', b'ARC\x00', 0x11, len(input_files), 0))
-    file_type_codes = gen_file_type_codes()
+    output = arc
+    if cipher is not None and stream:
+        output = arcc.ArccWriter(arc, cipher)
     file_data_pos = len(input_files) * 0x50 + 12
-    for i in range(len(input_files)):
-        file_name, file_extension = os.path.splitext(input_files[i])
+    arc.seek(file_data_pos)
+    toc = bytearray()
+    if not stream:
+        compressed_files = parallel_map(functools.partial(compress_file, cache=cache, profile=profile, store_threshold=store_threshold, cipher=cipher), input_files, jobs)
+    for input_file in input_files:
+        file_name, file_extension = os.path.splitext(input_file)
         file_name = file_name.replace('/', '\\')
         file_extension = file_extension.strip('.')
-        file_type_code = 0
-        for j in range(len(file_types)):
-            if file_extension == file_types[j][1]:
-                file_type_code = file_type_codes[j]
-                break
-        file_data = open(input_files[i], 'rb').read()
-        size = len(file_data) | 0x40000000
-        file_data = zlib.compress(file_data)
-        compressed_size = len(file_data)
-        arc.seek(i*0x50+12)
-        arc.write(struct.pack('64sIIII', file_name.encode(), file_type_code, compressed_size, size, file_data_pos))
-        arc.seek(file_data_pos)
+        file_type_code = arc_types.get_file_type_code(file_extension, game)
+        if stream and cipher is not None:
+            size, compressed_size = compress_stream(input_file, output, cache=cache, profile=profile, store_threshold=store_threshold, align=8)
+            compressed_size += output.pad()
+        elif stream:
+            size, compressed_size = compress_stream(input_file, arc, cache=cache, profile=profile, store_threshold=store_threshold)
+        else:
+            size, file_data = next(compressed_files)
+            compressed_size = len(file_data)
+            arc.write(file_data)
+        toc += struct.pack('64sIIII', file_name.encode(), file_type_code, compressed_size, size | 0x40000000, file_data_pos)
+        file_data_pos += compressed_size
+    if cipher is not None:
+        toc = cipher.encrypt(toc)
+    arc.seek(0)
+    arc.write(struct.pack('4sHHI', magic, 0x11, len(input_files), 0) + toc)
+    arc.close()
+
+def replace_arc(arc_file, name, input_file):
+    arc = open(arc_file, 'r+b')
+    version, file_count = read_header(arc.read(12))
+    toc = bytearray(arc.read(file_count * 0x50))
+    entries = read_toc(toc, version, file_count)
+    name = name.replace('/', '\\')
+    for i in range(file_count):
+        if entries[i].name == name:
+            break
+    else:
+        arc.close()
+        raise ValueError('table of contents: entry not found')
+    entry = entries[i]
+    size, file_data = compress_file(input_file)
+    if size > get_size_mask(version):
+        arc.close()
+        raise ValueError('input file: too large')
+    flags = struct.unpack_from('I', toc, i*0x50+72)[0] & ~get_size_mask(version)
+    struct.pack_into('II', toc, i*0x50+68, len(file_data), size | flags)
+    if len(file_data) <= entry.compressed_size:
+        print('replacing: {}, compressed size: {}, size: {}, in place'.format(entry.file_name, len(file_data), size))
+        arc.seek(entry.offset)
         arc.write(file_data)
-        file_data_pos += len(file_data)
+        arc.seek(i*0x50+12)
+        arc.write(toc[i*0x50:(i+1)*0x50])
+        arc.close()
+        return
+    print('replacing: {}, compressed size: {}, size: {}'.format(entry.file_name, len(file_data), size))
+    data = mmap.mmap(arc.fileno(), 0, access=mmap.ACCESS_READ)
+    file_data_pos = min([x.offset for x in entries] + [len(data)])
+    new_arc_file = arc_file + '.tmp'
+    new_arc = open(new_arc_file, 'wb')
+    new_arc.write(data[:file_data_pos])
+    old_end = file_data_pos
+    for j in sorted(range(file_count), key=lambda x: entries[x].offset):
+        if entries[j].offset > old_end:
+            new_arc.write(data[old_end:entries[j].offset])
+            file_data_pos += entries[j].offset - old_end
+        old_end = max(old_end, entries[j].offset + entries[j].compressed_size)
+        struct.pack_into('I', toc, j*0x50+76, file_data_pos)
+        if j == i:
+            new_arc.write(file_data)
+            file_data_pos += len(file_data)
+        else:
+            new_arc.write(data[entries[j].offset:entries[j].offset+entries[j].compressed_size])
+            file_data_pos += entries[j].compressed_size
+    new_arc.seek(12)
+    new_arc.write(toc)
+    new_arc.close()
+    data.close()
     arc.close()
+    os.replace(new_arc_file, arc_file)
+
+def verify_entry(item):
+    arc_file, arc, entry, last = item
+    try:
+        arc.read_entry(entry)
+    except (ValueError, zlib.error) as error:
+        return arc_file, arc, entry, last, error
+    return arc_file, arc, entry, last, None
+
+def get_verify_items(arc_files, bad_archives):
+    for arc_file in arc_files:
+        try:
+            arc = ArcReader(arc_file)
+        except (OSError, ValueError, struct.error) as error:
+            print('bad archive: {}, error: {}'.format(arc_file, error))
+            bad_archives.append(arc_file)
+            continue
+        if len(arc.entries) == 0:
+            arc.close()
+        for i, entry in enumerate(arc.entries):
+            yield arc_file, arc, entry, i == len(arc.entries) - 1
+
+def verify_arc(arc_files, jobs=None):
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    start = time.perf_counter()
+    bad_archives = []
+    bad_count = 0
+    entry_count = 0
+    compressed_size = 0
+    size = 0
+    for arc_file, arc, entry, last, error in parallel_map(verify_entry, get_verify_items(arc_files, bad_archives), jobs):
+        entry_count += 1
+        compressed_size += entry.compressed_size
+        size += entry.size
+        if error is not None:
+            print('bad entry: {}, file: {}, error: {}'.format(arc_file, entry.file_name, error))
+            bad_count += 1
+        if last:
+            arc.close()
+    bad_count += len(bad_archives)
+    elapsed = time.perf_counter() - start
+    print('verified archives: {}, entries: {}, bad: {}, compressed size: {}, size: {}, time: {:.3f}s, throughput: {:.1f} MB/s'.format(len(arc_files), entry_count, bad_count, compressed_size, size, elapsed, size / 0x100000 / max(elapsed, 1e-9)))
+    return bad_count
 
-parser = argparse.ArgumentParser(description='Extracts files from an ARC file from MH4U and MHX')
-subparsers = parser.add_subparsers(dest='mode')
-parser_x = subparsers.add_parser('x')
-parser_x.add_argument('--filelist', help='file list output')
-parser_x.add_argument('inputfile', help='ARC input file')
-parser_x.add_argument('outputpath', nargs='?', default='./', help='output path')
-parser_c = subparsers.add_parser('c')
-parser_c.add_argument('--filelist', help='file list input')
-parser_c.add_argument('outputfile', help='ARC output file')
-parser_c.add_argument('inputfile', nargs='*', help='input files')
-args = parser.parse_args()
-
-if args.mode == 'x':
-    extract_arc(args.inputfile, args.outputpath, args.filelist)
-elif args.mode == 'c':
+batch_readers = collections.OrderedDict()
+
+def get_batch_reader(arc_file):
+    arc = batch_readers.pop(arc_file, None)
+    if arc is None:
+        arc = ArcReader(arc_file)
+        if len(batch_readers) >= 64:
+            batch_readers.popitem(last=False)[1].close()
+    batch_readers[arc_file] = arc
+    return arc
+
+def link_file(source, file_name):
+    try:
+        os.link(source, file_name)
+    except FileExistsError:
+        os.remove(file_name)
+        os.link(source, file_name)
+
+def batch_extract_entry(item):
+    arc_file, entry, output_path, dedup_path = item
+    try:
+        file_data = get_batch_reader(arc_file).read_entry(entry)
+    except (ValueError, zlib.error) as error:
+        return arc_file, entry, 0, False, error
+    file_name = os.path.join(output_path, entry.file_name)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    if dedup_path is None:
+        open(file_name, 'wb').write(file_data)
+        return arc_file, entry, len(file_data), False, None
+    dedup_file = os.path.join(dedup_path, hashlib.sha1(file_data).hexdigest())
+    if os.path.exists(dedup_file):
+        link_file(dedup_file, file_name)
+        return arc_file, entry, len(file_data), True, None
+    temp_file = '{}.{}.tmp'.format(dedup_file, os.getpid())
+    open(temp_file, 'wb').write(file_data)
+    try:
+        os.link(temp_file, dedup_file)
+        linked = False
+    except FileExistsError:
+        linked = True
+    os.remove(temp_file)
+    link_file(dedup_file, file_name)
+    return arc_file, entry, len(file_data), linked, None
+
+def find_arc_files(paths):
+    arc_files = []
+    output_names = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for file_name in sorted(filenames):
+                    if file_name.lower().endswith('.arc'):
+                        arc_file = os.path.join(dirpath, file_name)
+                        arc_files.append((arc_file, os.path.splitext(os.path.relpath(arc_file, path))[0]))
+        else:
+            arc_files.append((path, os.path.splitext(os.path.basename(path))[0]))
+    for arc_file, name in arc_files:
+        other_file = output_names.setdefault(os.path.normcase(name), arc_file)
+        if other_file != arc_file:
+            raise ValueError('output path: {} and {} both extract to {}'.format(other_file, arc_file, name))
+    return arc_files
+
+def batch_extract_arc(paths, output_path, jobs=None, dedup=False):
+    if not os.path.isdir(output_path):
+        raise ValueError('output path: must be existing directory')
+    start = time.perf_counter()
+    arc_files = find_arc_files(paths)
+    dedup_path = None
+    if dedup:
+        dedup_path = os.path.join(output_path, '.dedup')
+        os.makedirs(dedup_path, exist_ok=True)
+    items = []
+    bad_count = 0
+    for arc_file, arc_output_path in arc_files:
+        try:
+            with ArcReader(arc_file) as arc:
+                for entry in arc.entries:
+                    items.append((arc_file, entry, os.path.join(output_path, arc_output_path), dedup_path))
+        except (OSError, ValueError, struct.error) as error:
+            print('bad archive: {}, error: {}'.format(arc_file, error))
+            bad_count += 1
+    extracted_count = 0
+    size = 0
+    linked_count = 0
+    try:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            for arc_file, entry, file_size, linked, error in executor.map(batch_extract_entry, items, chunksize=16):
+                if error is not None:
+                    print('bad entry: {}, file: {}, error: {}'.format(arc_file, entry.file_name, error))
+                    bad_count += 1
+                    continue
+                extracted_count += 1
+                size += file_size
+                linked_count += linked
+    finally:
+        if dedup_path is not None:
+            shutil.rmtree(dedup_path)
+    elapsed = time.perf_counter() - start
+    print('extracted archives: {}, files: {}, linked: {}, bad: {}, size: {}, time: {:.3f}s'.format(len(arc_files), extracted_count, linked_count, bad_count, size, elapsed))
+    return bad_count
+
+def list_arc(arc_files, as_json=False):
+    arcs = []
+    for arc_file in arc_files:
+        try:
+            with open(arc_file, 'rb') as arc:
+                version, file_count = read_header(arc.read(12))
+                toc = arc.read(file_count * 0x50)
+                if len(toc) != file_count * 0x50:
+                    raise ValueError('table of contents: wrong file count')
+                entries = read_toc(toc, version, file_count)
+        except (OSError, ValueError, struct.error) as error:
+            sys.stderr.write('bad archive: {}, error: {}\n'.format(arc_file, error))
+            continue
+        if as_json:
+            arcs.append({
+                'archive': arc_file,
+                'version': version,
+                'entries': [{
+                    'name': entry.name,
+                    'type': entry.file_type,
+                    'type_code': entry.file_type_code,
+                    'compressed_size': entry.compressed_size,
+                    'size': entry.size,
+                    'offset': entry.offset,
+                    'flags': entry.flags
+                } for entry in entries]
+            })
+            continue
+        print('archive: {}, version: {:#x}, files: {}'.format(arc_file, version, file_count))
+        for entry in entries:
+            print('file: {}, type: {}, type code: {:08X}, compressed size: {}, size: {}, offset: {}, flags: {:08X}'.format(entry.file_name, entry.file_type, entry.file_type_code, entry.compressed_size, entry.size, entry.offset, entry.flags))
+    if as_json:
+        json.dump(arcs, sys.stdout, indent=4)
+        sys.stdout.write('\n')
+
+def hash_raw_entries(arc, jobs=1):
+    return list(parallel_map(lambda entry: hashlib.sha1(arc.read_raw_entry(entry)).digest(), arc.entries, jobs))
+
+def gen_patch_ops(a, a_hashes, b, b_hashes):
+    a_offsets = {}
+    for entry, digest in zip(a.entries, a_hashes):
+        a_offsets.setdefault(digest, entry.offset)
+    ops = []
+    position = 0
+    for entry, digest in sorted(zip(b.entries, b_hashes), key=lambda x: x[0].offset):
+        if entry.offset < position or entry.compressed_size == 0 or digest not in a_offsets:
+            continue
+        if entry.offset > position:
+            ops.append([1, position, entry.offset - position])
+        if len(ops) != 0 and ops[-1][0] == 0 and ops[-1][1] + ops[-1][2] == a_offsets[digest]:
+            ops[-1][2] += entry.compressed_size
+        else:
+            ops.append([0, a_offsets[digest], entry.compressed_size])
+        position = entry.offset + entry.compressed_size
+    if position < len(b._data):
+        ops.append([1, position, len(b._data) - position])
+    return ops
+
+def write_patch(patch_file, a, b, ops):
+    with open(patch_file, 'wb') as patch:
+        patch.write(struct.pack('<4sIQQ20s', b'ARCP', len(ops), len(a._data), len(b._data), hashlib.sha1(b._data).digest()))
+        for kind, offset, size in ops:
+            patch.write(struct.pack('<BQQ', kind, offset, size))
+            if kind == 1:
+                patch.write(b._data[offset:offset+size])
+
+def apply_patch(arc_file, patch_file, output_file):
+    arc = open(arc_file, 'rb')
+    patch = open(patch_file, 'rb')
+    magic, op_count, arc_size, output_size, digest = struct.unpack('<4sIQQ20s', patch.read(struct.calcsize('<4sIQQ20s')))
+    if magic != b'ARCP':
+        raise ValueError('patch: invalid magic')
+    if os.fstat(arc.fileno()).st_size != arc_size:
+        raise ValueError('patch: wrong input file size')
+    output_hash = hashlib.sha1()
+    with open(output_file, 'wb') as output:
+        for i in range(op_count):
+            kind, offset, size = struct.unpack('<BQQ', patch.read(struct.calcsize('<BQQ')))
+            if kind == 0:
+                arc.seek(offset)
+                file_data = arc.read(size)
+            else:
+                file_data = patch.read(size)
+            if len(file_data) != size:
+                raise ValueError('patch: truncated data')
+            output_hash.update(file_data)
+            output.write(file_data)
+    arc.close()
+    patch.close()
+    if output_hash.digest() != digest:
+        raise ValueError('patch: output does not match')
+
+def diff_arc(a_file, b_file, patch_file=None, jobs=1):
+    a = ArcReader(a_file)
+    b = ArcReader(b_file)
+    a_hashes = hash_raw_entries(a, jobs)
+    b_hashes = hash_raw_entries(b, jobs)
+    a_index = {entry.name: (entry, digest) for entry, digest in zip(a.entries, a_hashes)}
+    counts = collections.Counter()
+    for entry, digest in zip(b.entries, b_hashes):
+        if entry.name not in a_index:
+            status = 'added'
+        else:
+            a_entry, a_digest = a_index.pop(entry.name)
+            if a_digest == digest:
+                status = 'unchanged'
+                if (a_entry.file_type_code, a_entry.size, a_entry.flags) != (entry.file_type_code, entry.size, entry.flags):
+                    status = 'modified'
+            elif a_entry.size == entry.size and a.read_entry(a_entry) == b.read_entry(entry):
+                status = 'recompressed'
+            else:
+                status = 'modified'
+        counts[status] += 1
+        if status != 'unchanged':
+            print('{}: {}'.format(status, entry.file_name))
+    for a_entry, a_digest in a_index.values():
+        counts['removed'] += 1
+        print('removed: {}'.format(a_entry.file_name))
+    print('unchanged: {}, recompressed: {}, modified: {}, added: {}, removed: {}'.format(counts['unchanged'], counts['recompressed'], counts['modified'], counts['added'], counts['removed']))
+    if patch_file:
+        write_patch(patch_file, a, b, gen_patch_ops(a, a_hashes, b, b_hashes))
+    a.close()
+    b.close()
+    return counts
+
+def get_input_files(file_list, paths):
     input_files = []
     try:
-        for line in open(args.filelist, 'r'):
+        for line in open(file_list, 'r'):
             line = line.strip()
             if line != '':
                 input_files.append(line)
     except:
         pass
-    for input_file in args.inputfile:
+    for input_file in paths:
         if os.path.isdir(input_file):
             for dirpath, dirnames, filenames in os.walk(input_file):
                 for file_name in filenames:
                     input_files.append(os.path.join(dirpath, file_name))
         else:
             input_files.append(input_file)
-    create_arc(args.outputfile, input_files)
+    return input_files
+
+def benchmark_arc(input_files, jobs=1, store_threshold=None):
+    with tempfile.TemporaryDirectory() as temp_path:
+        for profile in compression_profiles:
+            arc_file = os.path.join(temp_path, profile + '.arc')
+            start = time.perf_counter()
+            create_arc(arc_file, input_files, jobs, profile=profile, store_threshold=store_threshold)
+            build_time = time.perf_counter() - start
+            start = time.perf_counter()
+            with ArcReader(arc_file) as arc:
+                stored_count = sum(entry.compressed_size == entry.size for entry in arc)
+                for entry, file_data in inflate_entries(arc, arc.entries, jobs):
+                    pass
+            extract_time = time.perf_counter() - start
+            print('profile: {}, build time: {:.3f}s, size: {}, extraction time: {:.3f}s, stored entries: {}'.format(profile, build_time, os.path.getsize(arc_file), extract_time, stored_count))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extracts files from an ARC file from MH4U and MHX')
+    subparsers = parser.add_subparsers(dest='mode')
+    parser_x = subparsers.add_parser('x')
+    parser_x.add_argument('--filelist', help='file list output')
+    parser_x.add_argument('-j', '--jobs', type=int, default=1, help='number of entries to inflate in parallel')
+    parser_x.add_argument('--include', action='append', help='only extract files matching this glob (can be repeated)')
+    parser_x.add_argument('--exclude', action='append', help='skip files matching this glob (can be repeated)')
+    parser_x.add_argument('--type', action='append', help='only extract files with this type name, extension or hex type code (can be repeated)')
+    parser_x.add_argument('--output-format', choices=arc_container.output_formats, default='dir', help='write the files to a directory or into a single tar, zip or sqlite file')
+    parser_x.add_argument('--recursive', action='store_true', default=False, help='also extract the contents of nested ARC files')
+    parser_x.add_argument('--max-depth', type=int, default=4, help='maximum nesting depth for --recursive')
+    parser_x.add_argument('--memory-budget', type=int, default=256, help='maximum size in MiB of nested ARC files held in memory for --recursive')
+    parser_x_output = parser_x.add_mutually_exclusive_group()
+    parser_x_output.add_argument('--quiet', action='store_true', default=False, help='do not print each extracted file')
+    parser_x_output.add_argument('--progress', action='store_true', default=False, help='show a single progress line instead of each extracted file')
+    parser_x.add_argument('--metrics-json', help='write timing and throughput metrics to this JSON file')
+    parser_x.add_argument('inputfile', help='ARC input file')
+    parser_x.add_argument('outputpath', nargs='?', default=None, help='output path (default: ./ with --output-format dir)')
+    parser_c = subparsers.add_parser('c')
+    parser_c.add_argument('--filelist', help='file list input')
+    parser_c.add_argument('-j', '--jobs', type=int, default=1, help='number of files to compress in parallel')
+    parser_c.add_argument('--stream', action='store_true', default=False, help='compress files in fixed size chunks (ignores --jobs)')
+    parser_c.add_argument('--cache', help='compression cache directory')
+    parser_c.add_argument('--cache-size', type=int, default=1024, help='compression cache size limit in MiB')
+    parser_c.add_argument('--profile', choices=list(compression_profiles), default='default', help='compression profile')
+    parser_c.add_argument('--store-threshold', type=float, default=None, help='store files uncompressed when deflate saves less than this ratio')
+    parser_c.add_argument('--game', choices=arc_types.games, default=None, help='game to prefer when an extension is used by several file types')
+    parser_c.add_argument('--key', help='encrypt the output into an ARCC file with this key')
+    parser_c.add_argument('outputfile', help='ARC output file')
+    parser_c.add_argument('inputfile', nargs='*', help='input files')
+    parser_r = subparsers.add_parser('r')
+    parser_r.add_argument('arcfile', help='ARC file to modify')
+    parser_r.add_argument('name', help='name of the entry to replace')
+    parser_r.add_argument('inputfile', help='replacement input file')
+    parser_batch = subparsers.add_parser('batch')
+    parser_batch.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: all cores)')
+    parser_batch.add_argument('--dedup', action='store_true', default=False, help='hardlink files with identical contents')
+    parser_batch.add_argument('outputpath', help='output path')
+    parser_batch.add_argument('inputfile', nargs='+', help='ARC input files or directories')
+    parser_l = subparsers.add_parser('l')
+    parser_l.add_argument('--json', action='store_true', default=False, help='print the listing as JSON')
+    parser_l.add_argument('inputfile', nargs='+', help='ARC input files')
+    parser_diff = subparsers.add_parser('diff')
+    parser_diff.add_argument('-j', '--jobs', type=int, default=1, help='number of entries to hash in parallel')
+    parser_diff.add_argument('--patch', help='patch output file that rebuilds the second ARC file from the first')
+    parser_diff.add_argument('inputfile1', help='old ARC input file')
+    parser_diff.add_argument('inputfile2', help='new ARC input file')
+    parser_patch = subparsers.add_parser('patch')
+    parser_patch.add_argument('inputfile', help='old ARC input file')
+    parser_patch.add_argument('patchfile', help='patch input file')
+    parser_patch.add_argument('outputfile', help='new ARC output file')
+    parser_v = subparsers.add_parser('v')
+    parser_v.add_argument('-j', '--jobs', type=int, default=None, help='number of entries to inflate in parallel (default: all cores)')
+    parser_v.add_argument('inputfile', nargs='+', help='ARC input files')
+    parser_bench = subparsers.add_parser('bench')
+    parser_bench.add_argument('--filelist', help='file list input')
+    parser_bench.add_argument('-j', '--jobs', type=int, default=1, help='number of files to compress and inflate in parallel')
+    parser_bench.add_argument('--store-threshold', type=float, default=None, help='store files uncompressed when deflate saves less than this ratio')
+    parser_bench.add_argument('inputfile', nargs='*', help='input files')
+    args = parser.parse_args()
+
+    if args.mode == 'x':
+        if args.outputpath is None:
+            if args.output_format != 'dir':
+                parser_x.error('an output file is required with --output-format {}'.format(args.output_format))
+            args.outputpath = './'
+        max_depth = 0
+        if args.recursive:
+            max_depth = args.max_depth
+        stats = ArcStats(print_entry)
+        if args.quiet:
+            stats = ArcStats()
+        elif args.progress:
+            stats = ArcStats(ProgressPrinter())
+        extract_arc(args.inputfile, args.outputpath, args.filelist, args.jobs, args.include, args.exclude, args.type, args.output_format, max_depth, args.memory_budget * 0x100000, stats)
+        if args.progress:
+            stats.callback.print_progress(stats, '\n')
+        if args.metrics_json:
+            with open(args.metrics_json, 'w') as metrics:
+                json.dump(stats.get_metrics(), metrics, indent=4)
+    elif args.mode == 'c':
+        input_files = get_input_files(args.filelist, args.inputfile)
+        cache = None
+        if args.cache:
+            cache = CompressionCache(args.cache, args.cache_size * 0x100000)
+        create_arc(args.outputfile, input_files, args.jobs, args.stream, cache, args.profile, args.store_threshold, args.game, args.key)
+        if cache is not None:
+            cache.trim()
+            print('cache hits: {}, cache misses: {}'.format(cache.hits, cache.misses))
+    elif args.mode == 'r':
+        replace_arc(args.arcfile, args.name, args.inputfile)
+    elif args.mode == 'batch':
+        if batch_extract_arc(args.inputfile, args.outputpath, args.jobs, args.dedup) != 0:
+            sys.exit(1)
+    elif args.mode == 'l':
+        list_arc(args.inputfile, args.json)
+    elif args.mode == 'diff':
+        diff_arc(args.inputfile1, args.inputfile2, args.patch, args.jobs)
+    elif args.mode == 'patch':
+        apply_patch(args.inputfile, args.patchfile, args.outputfile)
+    elif args.mode == 'v':
+        if verify_arc(args.inputfile, args.jobs) != 0:
+            sys.exit(1)
+    elif args.mode == 'bench':
+        benchmark_arc(get_input_files(args.filelist, args.inputfile), args.jobs, args.store_threshold)
 
@@ -0,0 +1,166 @@
+# Copyright 2015 Seth VanHeulen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import pathlib
+import sqlite3
+import tarfile
+import time
+import zipfile
+
+
+output_formats = ['dir', 'tar', 'zip', 'sqlite']
+
+class DirectoryWriter:
+    def __init__(self, path):
+        if not os.path.isdir(path):
+            raise ValueError('output path: must be existing directory')
+        self.path = path
+
+    def write(self, name, data):
+        file_name = os.path.join(self.path, *name.split('/'))
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        open(file_name, 'wb').write(data)
+
+    def close(self):
+        pass
+
+class TarWriter:
+    def __init__(self, path):
+        self._tar = tarfile.open(path, 'w')
+        self._mtime = time.time()
+
+    def write(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self._mtime
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self._tar.close()
+
+class ZipWriter:
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED)
+
+    def write(self, name, data):
+        self._zip.writestr(name, data)
+
+    def close(self):
+        self._zip.close()
+
+class SqliteWriter:
+    def __init__(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode = OFF')
+        self._db.execute('PRAGMA synchronous = OFF')
+        self._db.execute('CREATE TABLE files (name TEXT PRIMARY KEY, data BLOB NOT NULL)')
+
+    def write(self, name, data):
+        self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?)', (name, data))
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+def open_writer(output_format, path):
+    if output_format == 'dir':
+        return DirectoryWriter(path)
+    if output_format == 'tar':
+        return TarWriter(path)
+    if output_format == 'zip':
+        return ZipWriter(path)
+    if output_format == 'sqlite':
+        return SqliteWriter(path)
+    raise ValueError('output format: unknown format')
+
+class DirectoryReader:
+    def __init__(self, path):
+        self.path = path
+
+    def names(self):
+        names = []
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for file_name in filenames:
+                names.append(os.path.relpath(os.path.join(dirpath, file_name), self.path).replace(os.sep, '/'))
+        return names
+
+    def read(self, name):
+        return open(os.path.join(self.path, *name.replace('\\', '/').split('/')), 'rb').read()
+
+    def close(self):
+        pass
+
+class TarReader:
+    def __init__(self, path):
+        self._tar = tarfile.open(path, 'r')
+        self._members = {info.name: info for info in self._tar.getmembers() if info.isfile()}
+
+    def names(self):
+        return list(self._members)
+
+    def read(self, name):
+        info = self._members.get(name.replace('\\', '/'))
+        if info is None:
+            raise KeyError('file not found: {}'.format(name))
+        return self._tar.extractfile(info).read()
+
+    def close(self):
+        self._tar.close()
+
+class ZipReader:
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, 'r')
+
+    def names(self):
+        return self._zip.namelist()
+
+    def read(self, name):
+        return self._zip.read(name.replace('\\', '/'))
+
+    def close(self):
+        self._zip.close()
+
+class SqliteReader:
+    def __init__(self, path):
+        self._db = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+
+    def names(self):
+        return [row[0] for row in self._db.execute('SELECT name FROM files')]
+
+    def read(self, name):
+        row = self._db.execute('SELECT data FROM files WHERE name = ?', (name.replace('\\', '/'),)).fetchone()
+        if row is None:
+            raise KeyError('file not found: {}'.format(name))
+        return row[0]
+
+    def close(self):
+        self._db.close()
+
+def open_reader(path):
+    if os.path.isdir(path):
+        return DirectoryReader(path)
+    with open(path, 'rb') as container:
+        magic = container.read(16)
+    if magic == b'SQLite format 3\x00':
+        return SqliteReader(path)
+    if zipfile.is_zipfile(path):
+        return ZipReader(path)
+    if tarfile.is_tarfile(path):
+        return TarReader(path)
+    raise ValueError('container: unknown format')
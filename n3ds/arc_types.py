@@ -0,0 +1,416 @@
+#!/usr/bin/python
+
+# Copyright 2015 Seth VanHeulen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import zlib
+
+
+mh4u_file_types = [
+    ['rArchive', 'arc'],
+    ['rCameraList', 'lcm'],
+    ['rChainCol', 'ccl'],
+    ['rCnsTinyChain', 'ctc'],
+    ['rCollision', 'sbc'],
+    ['rEffectAnim', 'ean'],
+    ['rEffectList', 'efl'],
+    ['rEnemyCmd', 'emc'],
+    ['rEnemyData', 'emd'],
+    ['rEnemyTuneData', 'etd'],
+    ['rEventActorTbl', 'evt'],
+    ['rGrass2', 'gr2'],
+    ['rGrass2Setting', 'gr2s'],
+    ['rGrassWind', 'grw'],
+    ['rItemPopList', 'ipl'],
+    ['rItemPopSet', 'ips'],
+    ['rLayout', 'lyt'],
+    ['rLayoutAnimeList', 'lanl'],
+    ['rLayoutFont', 'lfd'],
+    ['rLayoutMessage', 'lmd'],
+    ['rLtProceduralTexture', 'ptex'],
+    ['rLtShader', 'lfx'],
+    ['rLtSoundBank', 'sbk'],
+    ['rLtSoundCategoryFilter', 'cfl'],
+    ['rLtSoundRequest', 'srq'],
+    ['rLtSoundReverb', 'rev_ctr'],
+    ['rLtSoundSourceADPCM', 'mca'],
+    ['rLtSoundStreamRequest', 'stq'],
+    ['rMHSoundEmitter', 'ses'],
+    ['rMHSoundSequence', 'mss'],
+    ['rMaterial', 'mrl'],
+    ['rMhMotionEffect', 'mef'],
+    ['rModel', 'mod'],
+    ['rMotionList', 'lmt'],
+    ['rMovieOnDisk', 'moflex'],
+    ['rQuestData', 'mib'],
+    ['rScheduler', 'sdl'],
+    ['rSoundAttributeSe', 'ase'],
+    ['rSoundCurveSet', 'scs'],
+    ['rSoundDirectionalSet', 'sds'],
+    ['rStageAreaInfo', 'sai'],
+    ['rStageCameraData', 'scd'],
+    ['rStageInfoSet', 'sis'],
+    ['rSwkbdMessageStyleTable', 'skst'],
+    ['rSwkbdMessageTable', 'skmt'],
+    ['rSwkbdSubGroup', 'sksg'],
+    ['rTexture', 'tex'],
+]
+
+mhx_file_types = [
+    # Monster Hunter X demo file types
+    ['rAIWayPoint', 'way'],
+    ['rActivityData', 'atd'],
+    ['rAmuletData', 'amlt'],
+    ['rAmuletSkillData', 'amskl'],
+    ['rAmuletSlotData', 'amslt'],
+    ['rAngryParam', 'angryprm'],
+    ['rAreaActTblData', 'areaacttbl'],
+    ['rAreaCommonLink', 'areacmnlink'],
+    ['rAreaEatData', 'areaeatdat'],
+    ['rAreaInfo', 'areainfo'],
+    ['rAreaLinkData', 'arealinkdat'],
+    ['rAreaPatrolData', 'areapatrol'],
+    ['rAreaSelectData', 'areaseldat'],
+    ['rArmorBuildData', 'abd'],
+    ['rArmorColorData', 'acd'],
+    ['rArmorResistData', 'ard'],
+    ['rArmorSeData', 'ased'],
+    ['rArmorSeriesData', 'asd'],
+    ['rBodyData', 'bdd'],
+    ['rBowgunShellData', 'bgsd'],
+    ['rCommonScript', 'cms'],
+    ['rDecoData', 'deco'],
+    ['rEmDouMouKaData', 'mdd'],
+    ['rEmSetList', 'esl'],
+    ['rEmSizeCalcTblElement', 'emsizetbl'],
+    ['rEmSizeYureTbl', 'emyure'],
+    ['rEnemyDtBase', 'dtb'],
+    ['rEnemyDtBaseParts', 'dtp'],
+    ['rEnemyDtTune', 'dtt'],
+    ['rEnemyNandoData', 'nan'],
+    ['rEnemyResidentDtBase', 'rdb'],
+    ['rEquipBaseColorData', 'ebcd'],
+    ['rFestaPelTiedSe', 'pts'],
+    ['rFestaResourceList', 'frl'],
+    ['rFestaSoundEmitter', 'ses'],
+    ['rFestaSoundSequence', 'mss'],
+    ['rFishData', 'fsh'],
+    ['rFreeUseParam', 'fup'],
+    ['rFueMusicData', 'fmt'],
+    ['rFueMusicInfData', 'fmi'],
+    ['rFueMusicScData', 'fms'],
+    ['rGUI', 'gui'],
+    ['rGUIFont', 'gfd'],
+    ['rGUIIconInfo', 'gii'],
+    ['rGUIMessage', 'gmd'],
+    ['rHagi', 'hgi'],
+    ['rHitDataEnemy', 'hde'],
+    ['rHitDataPlayer', 'hdp'],
+    ['rHitDataShell', 'hds'],
+    ['rHitSize', 'hts'],
+    ['rHunterArtsData', 'hta'],
+    ['rInsectAbirity', 'insectabirity'],
+    ['rInsectAttr', 'isa'],
+    ['rInsectData', 'isd'],
+    ['rInsectEssenceSkill', 'insectessenceskill'],
+    ['rInsectLevel', 'isl'],
+    ['rInsectParam', 'isp'],
+    ['rItemData', 'itm'],
+    ['rItemPreData', 'itp'],
+    ['rItemPreTypeData', 'ipt'],
+    ['rKireajiData', 'kad'],
+    ['rKowareObjData', 'kod'],
+    ['rLayoutAnime', 'lan'],
+    ['rMapTimeData', 'maptime'],
+    ['rMonsterPartsManager', 'mpm'],
+    ['rOtArmorData', 'oar'],
+    ['rOtLevel', 'olvl'],
+    ['rOtMessageLot', 'otml'],
+    ['rOtQuestExpBias', 'oxpb'],
+    ['rOtQuestExpValue', 'oxpv'],
+    ['rOtSkill', 'oskl'],
+    ['rOtSpecialAction', 'osa'],
+    ['rOtSupportActionBase', 'sab'],
+    ['rOtSupportActionOtUnique', 'saou'],
+    ['rOtTensionData', 'otd'],
+    ['rOtTrainParam', 'otp'],
+    ['rOtWeaponData', 'owp'],
+    ['rPlBaseCmd', 'plbasecmd'],
+    ['rPlCmdTblList', 'plcmdtbllist'],
+    ['rPlayerGimmickType', 'plgmktype'],
+    ['rPlayerManyAttacks', 'pma'],
+    ['rPlayerPartsDisp', 'plpartsdisp'],
+    ['rPlayerWeaponList', 'plweplist'],
+    ['rPointPos', 'pntpos'],
+    ['rProofEffectColorControl', 'pec'],
+    ['rProofEffectList', 'pel'],
+    ['rProofEffectMotSequenceList', 'psl'],
+    ['rProofEffectParamScript', 'pep'],
+    ['rQuestGroup', 'qsg'],
+    ['rRapidshotData', 'raps'],
+    ['rRelationData', 'rlt'],
+    ['rRem', 'rem'],
+    ['rSeFsAse', 'sfsa'],
+    ['rSetEmMain', 'sem'],
+    ['rSetItemData', 'sid'],
+    ['rShell', 'shell'],
+    ['rShellEffectParam', 'sep'],
+    ['rSkillData', 'skd'],
+    ['rSkillTypeData', 'skt'],
+    ['rSoundBank', 'sbkr'],
+    ['rSoundEQ', 'equr'],
+    ['rSoundRequest', 'srqr'],
+    ['rSoundReverb', 'revr_ctr'],
+    ['rSoundSourceADPCM', 'mca'],
+    ['rSoundStreamRequest', 'stqr'],
+    ['rSquatshotData', 'squs'],
+    ['rSupplyList', 'sup'],
+    ['rSupportGaugeValue', 'spval'],
+    ['rTameshotData', 'tams'],
+    ['rWeapon00BaseData', 'w00d'],
+    ['rWeapon00LevelData', 'w00d'],
+    ['rWeapon00MsgData', 'w00m'],
+    ['rWeapon01BaseData', 'w01d'],
+    ['rWeapon01LevelData', 'w01d'],
+    ['rWeapon01MsgData', 'w01m'],
+    ['rWeapon02BaseData', 'w02d'],
+    ['rWeapon02LevelData', 'w02d'],
+    ['rWeapon02MsgData', 'w02m'],
+    ['rWeapon03BaseData', 'w03d'],
+    ['rWeapon03LevelData', 'w03d'],
+    ['rWeapon03MsgData', 'w03m'],
+    ['rWeapon04BaseData', 'w04d'],
+    ['rWeapon04LevelData', 'w04d'],
+    ['rWeapon04MsgData', 'w04m'],
+    ['rWeapon06BaseData', 'w06d'],
+    ['rWeapon06LevelData', 'w06d'],
+    ['rWeapon06MsgData', 'w06m'],
+    ['rWeapon07BaseData', 'w07d'],
+    ['rWeapon07LevelData', 'w07d'],
+    ['rWeapon07MsgData', 'w07m'],
+    ['rWeapon08BaseData', 'w08d'],
+    ['rWeapon08LevelData', 'w08d'],
+    ['rWeapon08MsgData', 'w08m'],
+    ['rWeapon09BaseData', 'w09d'],
+    ['rWeapon09LevelData', 'w09d'],
+    ['rWeapon09MsgData', 'w09m'],
+    ['rWeapon10BaseData', 'w10d'],
+    ['rWeapon10LevelData', 'w10d'],
+    ['rWeapon10MsgData', 'w10m'],
+    ['rWeapon11BaseData', 'w11d'],
+    ['rWeapon11LevelData', 'w11d'],
+    ['rWeapon11MsgData', 'w11m'],
+    ['rWeapon12BaseData', 'w12d'],
+    ['rWeapon12LevelData', 'w12d'],
+    ['rWeapon12MsgData', 'w12m'],
+    ['rWeapon13BaseData', 'w13d'],
+    ['rWeapon13LevelData', 'w13d'],
+    ['rWeapon13MsgData', 'w13m'],
+    ['rWeapon14BaseData', 'w14d'],
+    ['rWeapon14LevelData', 'w14d'],
+    ['rWeapon14MsgData', 'w14m'],
+    # Monster Hunter X file types
+    ['rAcNyanterEquip', 'ane'],
+    ['rAcPlayerEquip', 'ape'],
+    ['rAreaConnect', 'acn'],
+    ['rArmorCreateData', 'arcd'],
+    ['rArmorProcessData', 'apd'],
+    ['rBui', 'bui'],
+    ['rCatSkillData', 'cskd'],
+    ['rDLCOtomoInfo', 'doi'],
+    ['rDecoCreateData', 'dcd'],
+    ['rEquipShopListA00', 'sla00'],
+    ['rEquipShopListW00', 'slw00'],
+    ['rEquipShopListW01', 'slw01'],
+    ['rEquipShopListW02', 'slw02'],
+    ['rEquipShopListW03', 'slw03'],
+    ['rEquipShopListW04', 'slw04'],
+    ['rEquipShopListW06', 'slw06'],
+    ['rEquipShopListW07', 'slw07'],
+    ['rEquipShopListW08', 'slw08'],
+    ['rEquipShopListW09', 'slw09'],
+    ['rEquipShopListW10', 'slw10'],
+    ['rEquipShopListW11', 'slw11'],
+    ['rEquipShopListW12', 'slw12'],
+    ['rEquipShopListW13', 'slw13'],
+    ['rEquipShopListW14', 'slw14'],
+    ['rFloorLvData', 'fld'],
+    ['rFreeHuntData', 'fht'],
+    ['rGeyserPointData', 'gpd'],
+    ['rGuestEffectiveAttr', 'atr'],
+    ['rGuestQuestData', 'mib'],
+    ['rGuestRemData', 'rem'],
+    ['rInsectAttrFeed', 'iaf'],
+    ['rInsectGrowFeed', 'igf'],
+    ['rItemCategoryTypeData', 'ict'],
+    ['rKitchenListGrillItem', 'kcg'],
+    ['rKitchenListMenu', 'kcm'],
+    ['rKitchenListSkillAlcohol', 'kca'],
+    ['rKitchenListSkillRandom', 'kcr'],
+    ['rKitchenListSkillSet', 'kcs'],
+    ['rKitchenListSuccessTable1', 'kc1'],
+    ['rKitchenListSuccessTable2', 'kc2'],
+    ['rKitchenListSuccessTable3', 'kc3'],
+    ['rMonNyanAdventItem', 'mai'],
+    ['rMonNyanCirclePattern', 'mcn'],
+    ['rMonNyanCommonMaterial', 'mcm'],
+    ['rMonNyanExp', 'mex'],
+    ['rMonNyanLotAdvent', 'mla'],
+    ['rMonNyanLotCommon', 'mlc'],
+    ['rMonNyanLotEnemy', 'mle'],
+    ['rMonNyanReward', 'mri'],
+    ['rMonNyanRewardEnemy', 'mre'],
+    ['rMonNyanRewardSecret', 'mrs'],
+    ['rMonNyanVillagePoint', 'mvp'],
+    ['rNpcBaseData', 'npcBd'],
+    ['rNpcBaseData_ID', 'npcId'],
+    ['rNpcBaseData_Mdl', 'npcMdl'],
+    ['rNpcInitScript', 'nis'],
+    ['rNpcLocateData', 'nld'],
+    ['rNpcMoveData', 'npcMd'],
+    ['rNpcSubData', 'npcSd'],
+    ['rNpcTalkData', 'ntd'],
+    ['rOtEquipCreate', 'oec'],
+    ['rOtIniLot', 'otil'],
+    ['rOtLotOwnSkill', 'olsk'],
+    ['rOtLotOwnSupport', 'olos'],
+    ['rOtParamLot', 'opl'],
+    ['rOtPointTable', 'otpt'],
+    ['rPieceCreateList', 'pcl'],
+    ['rSansaijijiExchange', 'ssjje'],
+    ['rSansaijijiPresent', 'ssjjp'],
+    ['rShopList', 'slt'],
+    ['rShopListSale', 'sls'],
+    ['rSpActData', 'sad'],
+    ['rTradeDeliveryList', 'trdl'],
+    ['rTradeItemList', 'tril'],
+    ['rTradeLimitedItemList', 'tlil'],
+    ['rTradeLotList', 'trll'],
+    ['rTradePointItemList', 'tpil'],
+    ['rTutorialCylinderData', 'tucyl'],
+    ['rTutorialFlowData', 'tuto'],
+    ['rVillageFirstPos', 'vfp'],
+    ['rWeaponCreateData', 'wcd'],
+    ['rWeaponProcessData', 'wpd'],
+]
+
+mhxx_file_types = [
+    #['rAIDynamicLayout', ''],
+    #['rAIPathBase', ''],
+    #['rAIPathBaseXml', ''],
+    #['rAIWayPointGraph', ''],
+    #['rActParam', ''],
+    #['rActionUseParam', ''],
+    ['rAlchemyData', 'alc'],
+    ['rAngleLimitData', 'AngleLimit'],
+    #['rChain', ''],
+    #['rCnsIK', ''],
+    #['rCnsJointOffset', ''],
+    #['rCnsMatrix', ''],
+    #['rCnsTinyIK', ''],
+    ['rCoinTradeList', 'ctl'],
+    #['rCollisionHeightField', ''],
+    #['rCollisionObj', ''],
+    #['rConstraint', ''],
+    #['rConvexHull', ''],
+    #['rDLCItemPackInfo', ''],
+    #['rDLCUpdateInfo', ''],
+    #['rDebugActionData', ''],
+    #['rDebugAtkActSet', ''],
+    #['rDebugAtkActSet', ''],
+    #['rEffect2D', ''],
+    #['rEffectStrip', ''],
+    #['rEmSetData', ''],
+    #['rEnemyDataTable', ''],
+    #['rEnemyDebugSetData', ''],
+    #['rFestaResource', ''],
+    #['rGeometry2', ''],
+    #['rGeometry2', ''],
+    #['rGeometry2Group', ''],
+    #['rGeometry3', ''],
+    #['rGrass', ''],
+    #['rMovie', ''],
+    #['rMovieOnMemory', ''],
+    #['rNavigationMesh', ''],
+    #['rNulls', ''],
+    #['rOtodokeConditionList', ''],
+    ['rOtodokeSetList', 'ots'],
+    #['rPastQuestGroup', ''],
+    #['rPlayerDummyAction', ''],
+    ['rQuestDaily', 'qdm'],
+    ['rQuestLink', 'qdl'],
+    ['rQuestPlus', 'qdp'],
+    #['rRenderTargetTexture', ''],
+    ['rResearchReinforce', 'ots'],
+    #['rResourceSample', ''],
+    #['rSoundSource', ''],
+    #['rSoundSourceWav', ''],
+    #['rTrialArts', ''],
+    #['rTrialBowBottle', ''],
+    #['rTrialBowShot', ''],
+    #['rTrialDataCommon', ''],
+    #['rTrialDataNyanter', ''],
+    #['rTrialEquipData', ''],
+    #['rTrialEquipOtomo', ''],
+    #['rTrialEquipParam', ''],
+    #['rTrialHeavyBowgunData', ''],
+    #['rTrialItemPoach', ''],
+    #['rTrialLightBowgun', ''],
+    #['rTrialLoadShellCount', ''],
+    #['rTrialOtomoParam', ''],
+    #['rVertices', ''],
+    #['rVibration', ''],
+    #['rVramLoadList', '']
+]
+
+games = ['mh4u', 'mhx', 'mhxx']
+
+file_types_by_game = {
+    'mh4u': mh4u_file_types,
+    'mhx': mhx_file_types,
+    'mhxx': mhxx_file_types
+}
+
+file_types = mh4u_file_types + mhx_file_types + mhxx_file_types
+
+def gen_file_type_code(file_type):
+    return (zlib.crc32(file_type.encode()) ^ 0xffffffff) & 0x7fffffff
+
+# an extension used by several file types maps to the first of them in the
+# preferred game, then in the other games in the order they are listed
+def gen_extension_codes(game=None):
+    priority = games
+    if game is not None:
+        priority = [game] + [x for x in games if x != game]
+    extension_codes = {}
+    for x in priority:
+        for file_type, file_extension in file_types_by_game[x]:
+            extension_codes.setdefault(file_extension, file_type_codes[file_type])
+    return extension_codes
+
+file_type_codes = {file_type: gen_file_type_code(file_type) for file_type, file_extension in file_types}
+
+code_file_types = {}
+for file_type, file_extension in file_types:
+    code_file_types.setdefault(file_type_codes[file_type], (file_type, file_extension))
+
+extension_codes = {game: gen_extension_codes(game) for game in games}
+extension_codes[None] = gen_extension_codes()
+
+def get_file_type(file_type_code):
+    return code_file_types.get(file_type_code, ('UNKNOWN', '{:08X}'.format(file_type_code)))
+
+def get_file_type_code(file_extension, game=None):
+    return extension_codes[game].get(file_extension, 0)
@@ -17,25 +17,179 @@
 
 import argparse
 import array
+import mmap
+import os
 import struct
+import tempfile
+import threading
+import time
+import zlib
 
 from Crypto.Cipher import Blowfish
 
+import arc
+import arc_container
+from arc import parallel_map
+
+
+def new_cipher(key):
+    if isinstance(key, str):
+        key = key.encode()
+    return Blowfish.new(key, Blowfish.MODE_ECB)
 
 def decrypt(buff, key):
     buff = array.array('I', buff)
     buff.byteswap()
-    buff = array.array('I', Blowfish.new(key).decrypt(buff.tobytes()))
+    buff = array.array('I', new_cipher(key).decrypt(buff.tobytes()))
     buff.byteswap()
     return buff.tobytes()
 
-def decrypt_arcc(arcc_file, key, arc_file):
-    arcc = open(arcc_file, 'rb')
-    magic, version, file_count, unknown = struct.unpack('4sHHI', arcc.read(12))
+def encrypt(buff, key):
+    buff = array.array('I', buff)
+    buff.byteswap()
+    buff = array.array('I', new_cipher(key).encrypt(buff.tobytes()))
+    buff.byteswap()
+    return buff.tobytes()
+
+class ArccCipher:
+    def __init__(self, key, chunk_size=0x10000):
+        self.key = key
+        self.chunk_size = chunk_size - chunk_size % 8
+        self._local = threading.local()
+
+    def _get_buffer(self):
+        if not hasattr(self._local, 'cipher'):
+            self._local.cipher = new_cipher(self.key)
+            self._local.buff = array.array('I', bytes(self.chunk_size))
+            self._local.view = memoryview(self._local.buff).cast('B')
+        return self._local.cipher, self._local.buff, self._local.view
+
+    def _transform_chunks(self, data, offset, size, encrypt):
+        cipher, buff, view = self._get_buffer()
+        transform = cipher.decrypt
+        if encrypt:
+            transform = cipher.encrypt
+        end = offset + size
+        while offset < end:
+            length = min(self.chunk_size, end - offset)
+            view[:length] = data[offset:offset+length]
+            buff.byteswap()
+            view[:length] = transform(view[:length])
+            buff.byteswap()
+            yield offset, view[:length]
+            offset += length
+
+    def decrypt_chunks(self, data, offset, size):
+        return self._transform_chunks(data, offset, size, False)
+
+    def encrypt_chunks(self, data, offset, size):
+        return self._transform_chunks(data, offset, size, True)
+
+    def decrypt(self, data):
+        return b''.join(bytes(chunk) for offset, chunk in self.decrypt_chunks(data, 0, len(data)))
+
+    def encrypt(self, data):
+        return b''.join(bytes(chunk) for offset, chunk in self.encrypt_chunks(data, 0, len(data)))
+
+class ArccWriter:
+    def __init__(self, output, cipher):
+        self._output = output
+        self._cipher = cipher
+        self._pending = b''
+
+    def write(self, data):
+        data = self._pending + data
+        length = len(data) - len(data) % 8
+        self._pending = data[length:]
+        if length != 0:
+            self._output.write(self._cipher.encrypt(data[:length]))
+
+    def pad(self):
+        padding = -len(self._pending) % 8
+        self.write(bytes(padding))
+        return padding
+
+    def tell(self):
+        return self._output.tell() + len(self._pending)
+
+    def seek(self, offset):
+        self._pending = b''
+        return self._output.seek(offset)
+
+    def truncate(self):
+        return self._output.truncate()
+
+def read_arcc_header(header):
+    magic, version, file_count, unknown = struct.unpack('4sHHI', header)
     if magic != b'ARCC':
         raise ValueError('header: invalid magic')
     if version != 0x11:
         raise ValueError('header: invalid version')
+    return file_count, unknown
+
+def decrypt_arcc(arcc_file, key, arc_file, jobs=1):
+    decryptor = ArccCipher(key)
+    arcc = open(arcc_file, 'rb')
+    data = mmap.mmap(arcc.fileno(), 0, access=mmap.ACCESS_READ)
+    file_count, unknown = read_arcc_header(data[:12])
+    arc = open(arc_file, 'wb')
+    arc.write(struct.pack('4sHHI', b'ARCC', 0x11, file_count, unknown))
+    toc = decryptor.decrypt(data[12:file_count*0x50+12])
+    arc.write(toc)
+    lock = threading.Lock()
+    def decrypt_entry(i):
+        size, offset = struct.unpack_from('I4xI', toc, i*0x50+68)
+        if offset + size > len(data):
+            raise ValueError('table of contents: wrong file size')
+        for chunk_offset, chunk in decryptor.decrypt_chunks(data, offset, size):
+            with lock:
+                arc.seek(chunk_offset)
+                arc.write(chunk)
+        return i
+    for i in parallel_map(decrypt_entry, range(file_count), jobs):
+        pass
+    data.close()
+    arcc.close()
+    arc.close()
+
+def extract_arcc(arcc_file, key, output_path, jobs=1, output_format='dir', stats=None):
+    if stats is None:
+        stats = arc.ArcStats(arc.print_entry)
+    decryptor = ArccCipher(key)
+    writer = arc_container.open_writer(output_format, output_path)
+    arcc = open(arcc_file, 'rb')
+    data = mmap.mmap(arcc.fileno(), 0, access=mmap.ACCESS_READ)
+    start = time.perf_counter()
+    file_count, unknown = read_arcc_header(data[:12])
+    entries = arc.read_toc(decryptor.decrypt(data[12:file_count*0x50+12]), 0x11, file_count)
+    stats.add_time('toc', time.perf_counter() - start)
+    stats.total_entries += file_count
+    def decrypt_entry(entry):
+        if entry.offset + entry.compressed_size > len(data):
+            raise ValueError('table of contents: wrong compressed file size')
+        start = time.perf_counter()
+        decompressor = zlib.decompressobj()
+        file_data = []
+        for offset, chunk in decryptor.decrypt_chunks(data, entry.offset, entry.compressed_size):
+            if entry.compressed_size == entry.size: # stored without compression
+                file_data.append(bytes(chunk))
+            elif not decompressor.eof:
+                file_data.append(decompressor.decompress(chunk))
+        file_data = b''.join(file_data)
+        if len(file_data) != entry.size:
+            raise ValueError('table of contents: wrong file size')
+        stats.add_time('inflate', time.perf_counter() - start)
+        return entry, file_data
+    for entry, file_data in parallel_map(decrypt_entry, entries, jobs):
+        arc.extract_entry(writer, entry, entry.name.replace('\\', '/'), file_data, stats=stats)
+    data.close()
+    arcc.close()
+    writer.close()
+    return stats
+
+def decrypt_arcc_reference(arcc_file, key, arc_file):
+    arcc = open(arcc_file, 'rb')
+    file_count, unknown = read_arcc_header(arcc.read(12))
     arc = open(arc_file, 'wb')
     arc.write(struct.pack('4sHHI', b'ARCC', 0x11, file_count, unknown))
     toc = decrypt(arcc.read(file_count * 0x50), key)
@@ -48,11 +202,38 @@ def decrypt_arcc(arcc_file, key, arc_file):
     arcc.close()
     arc.close()
 
-parser = argparse.ArgumentParser(description='Decrypts an ARCC file from MHX')
-parser.add_argument('inputfile', help='ARCC input file')
-parser.add_argument('key', help='encryption key')
-parser.add_argument('outputfile', help='ARC output file')
-args = parser.parse_args()
+def benchmark_arcc(arcc_file, key, jobs=1):
+    size = os.path.getsize(arcc_file)
+    with tempfile.TemporaryDirectory() as temp_path:
+        reference_file = os.path.join(temp_path, 'reference.arc')
+        start = time.perf_counter()
+        decrypt_arcc_reference(arcc_file, key, reference_file)
+        reference_time = time.perf_counter() - start
+        print('reference: time: {:.3f}s, throughput: {:.1f} MB/s'.format(reference_time, size / 0x100000 / max(reference_time, 1e-9)))
+        output_file = os.path.join(temp_path, 'output.arc')
+        start = time.perf_counter()
+        decrypt_arcc(arcc_file, key, output_file, jobs)
+        output_time = time.perf_counter() - start
+        print('streaming, jobs: {}: time: {:.3f}s, throughput: {:.1f} MB/s'.format(jobs, output_time, size / 0x100000 / max(output_time, 1e-9)))
+        if open(reference_file, 'rb').read() != open(output_file, 'rb').read():
+            raise ValueError('benchmark: outputs do not match')
 
-decrypt_arcc(args.inputfile, args.key, args.outputfile)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Decrypts an ARCC file from MHX')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of entries to decrypt in parallel')
+    parser.add_argument('--benchmark', action='store_true', default=False, help='compare the throughput with the reference implementation instead of writing output')
+    parser.add_argument('-x', '--extract', action='store_true', default=False, help='extract the files to the output path instead of writing an ARC file')
+    parser.add_argument('--output-format', choices=arc_container.output_formats, default='dir', help='write the extracted files to a directory or into a single tar, zip or sqlite file')
+    parser.add_argument('inputfile', help='ARCC input file')
+    parser.add_argument('key', help='encryption key')
+    parser.add_argument('outputfile', nargs='?', help='ARC output file, or output path with --extract')
+    args = parser.parse_args()
 
+    if args.benchmark:
+        benchmark_arcc(args.inputfile, args.key, args.jobs)
+    elif args.outputfile is None:
+        parser.error('the following arguments are required: outputfile')
+    elif args.extract:
+        extract_arcc(args.inputfile, args.key, args.outputfile, args.jobs, args.output_format)
+    else:
+        decrypt_arcc(args.inputfile, args.key, args.outputfile, args.jobs)
@@ -16,29 +16,128 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import mmap
+import os
 import struct
+import sys
+import time
 import zlib
 
+import arc_types
+
 
 def convert_quest(arc_file, output_file):
-    arc = open(arc_file, 'rb').read()
-    count = struct.unpack_from('H', arc, 6)[0]
-    compressed_size, offset = struct.unpack_from('I4xI', arc, 12 + (count - 1) * 0x50 + 68)
-    data = zlib.decompress(arc[offset:offset+compressed_size])
-    data = data[:0x138] + data[0x138:0x138+68]*4 + data[0x138:]
-    size = len(data)
-    data = zlib.compress(data)
-    with open(output_file, 'wb') as output:
-        output.write(arc)
-        output.seek(12 + (count - 1) * 0x50 + 68)
-        output.write(struct.pack('II', len(data), size))
-        output.seek(offset)
-        output.write(data)
-
-parser = argparse.ArgumentParser(description='Converts a MHX quest file to work with MHGen')
-parser.add_argument('inputfile', help='Japanese quest input file')
-parser.add_argument('outputfile', help='quest output file')
-args = parser.parse_args()
-
-convert_quest(args.inputfile, args.outputfile)
+    with open(arc_file, 'rb') as arc_input:
+        arc = mmap.mmap(arc_input.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            count = struct.unpack_from('H', arc, 6)[0]
+            file_type_code = struct.unpack_from('I', arc, 12 + (count - 1) * 0x50 + 64)[0]
+            if arc_types.get_file_type(file_type_code)[0] not in ['rQuestData', 'rGuestQuestData']:
+                raise ValueError('table of contents: last file is not quest data')
+            compressed_size, offset = struct.unpack_from('I4xI', arc, 12 + (count - 1) * 0x50 + 68)
+            data = zlib.decompress(arc[offset:offset+compressed_size])
+            data = data[:0x138] + data[0x138:0x138+68]*4 + data[0x138:]
+            size = len(data)
+            data = zlib.compress(data)
+            with open(output_file, 'wb') as output:
+                output.write(arc[:12 + (count - 1) * 0x50 + 68])
+                output.write(struct.pack('II', len(data), size))
+                output.write(arc[12 + (count - 1) * 0x50 + 76:offset])
+                output.write(data)
+                output.write(arc[offset+len(data):])
+        finally:
+            arc.close()
+
+def hash_file(file_name):
+    return hashlib.sha1(open(file_name, 'rb').read()).hexdigest()
+
+def convert_quest_item(item):
+    arc_file, output_file = item
+    try:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        convert_quest(arc_file, output_file)
+    except (OSError, ValueError, struct.error, zlib.error) as error:
+        return arc_file, output_file, None, error
+    return arc_file, output_file, hash_file(output_file), None
+
+def find_quest_files(paths):
+    quest_files = []
+    output_names = {}
+    for path in paths:
+        for match in sorted(glob.glob(path)) or [path]:
+            if os.path.isdir(match):
+                for dirpath, dirnames, filenames in os.walk(match):
+                    dirnames.sort()
+                    for file_name in sorted(filenames):
+                        if file_name.lower().endswith('.arc'):
+                            quest_file = os.path.join(dirpath, file_name)
+                            quest_files.append((quest_file, os.path.relpath(quest_file, match)))
+            else:
+                quest_files.append((match, os.path.basename(match)))
+    for quest_file, name in quest_files:
+        other_file = output_names.setdefault(os.path.normcase(name), quest_file)
+        if other_file != quest_file:
+            raise ValueError('output path: {} and {} both convert to {}'.format(other_file, quest_file, name))
+    return quest_files
+
+def convert_quests(paths, output_path, jobs=None):
+    start = time.perf_counter()
+    os.makedirs(output_path, exist_ok=True)
+    manifest_file = os.path.join(output_path, '.convert_quest.json')
+    manifest = {}
+    if os.path.exists(manifest_file):
+        manifest = json.load(open(manifest_file, 'r'))
+    items = []
+    skipped_count = 0
+    failed_count = 0
+    for arc_file, name in find_quest_files(paths):
+        output_file = os.path.join(output_path, name)
+        entry = manifest.get(name)
+        try:
+            input_hash = hash_file(arc_file)
+            if entry is not None and entry['input'] == input_hash and os.path.exists(output_file) and hash_file(output_file) == entry['output']:
+                skipped_count += 1
+                continue
+        except OSError as error:
+            print('failed: {}, error: {}'.format(arc_file, error))
+            manifest.pop(name, None)
+            failed_count += 1
+            continue
+        manifest[name] = {'input': input_hash, 'output': None}
+        items.append((arc_file, output_file))
+    converted_count = 0
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        for arc_file, output_file, output_hash, error in executor.map(convert_quest_item, items, chunksize=8):
+            name = os.path.relpath(output_file, output_path)
+            if error is not None:
+                print('failed: {}, error: {}'.format(arc_file, error))
+                del manifest[name]
+                failed_count += 1
+                continue
+            manifest[name]['output'] = output_hash
+            converted_count += 1
+    with open(manifest_file, 'w') as manifest_output:
+        json.dump(manifest, manifest_output, indent=4, sort_keys=True)
+    elapsed = time.perf_counter() - start
+    print('converted: {}, skipped: {}, failed: {}, time: {:.3f}s, conversions/s: {:.1f}'.format(converted_count, skipped_count, failed_count, elapsed, converted_count / max(elapsed, 1e-9)))
+    return failed_count
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converts a MHX quest file to work with MHGen')
+    parser.add_argument('--batch', metavar='OUTPUTPATH', help='convert every quest file in the given files, directories or globs into this path')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes for --batch (default: all cores)')
+    parser.add_argument('inputfile', help='Japanese quest input file')
+    parser.add_argument('outputfile', nargs='*', help='quest output file, or more input files with --batch')
+    args = parser.parse_args()
 
+    if args.batch:
+        if convert_quests([args.inputfile] + args.outputfile, args.batch, args.jobs) != 0:
+            sys.exit(1)
+    elif len(args.outputfile) != 1:
+        parser.error('expected one quest output file')
+    else:
+        convert_quest(args.inputfile, args.outputfile[0])
@@ -18,134 +18,13 @@
 import argparse
 import array
 import os
+import sys
 
 from PIL import Image
 
+import texbatch
+import texdecode
 
-modifier_tables = (
-    (2, 8, -2, -8),
-    (5, 17, -5, -17),
-    (9, 29, -9, -29),
-    (13, 42, -13, -42),
-    (18, 60, -18, -60),
-    (24, 80, -24, -80),
-    (33, 106, -33, -106),
-    (47, 183, -47, -183)
-)
-
-def decode_etc1(data, width, alpha=False):
-    data = array.array('I', data)
-    block_index = 0
-    pixel_count = len(data) * 4
-    if not alpha:
-        pixel_count *= 2
-    new = array.array('I', range(pixel_count))
-    while len(data) != 0:
-        alpha_part1 = 0xffffffff
-        alpha_part2 = 0xffffffff
-        if alpha:
-            alpha_part1 = data.pop(0)
-            alpha_part2 = data.pop(0)
-        pixel_indices = data.pop(0)
-        block_info = data.pop(0)
-        bc1 = [0, 0, 0]
-        bc2 = [0, 0, 0]
-        if block_info & 2 == 0:
-            bc1[0] = block_info >> 28 & 15
-            bc1[1] = block_info >> 20 & 15
-            bc1[2] = block_info >> 12 & 15
-            bc1 = [(x << 4) + x for x in bc1]
-            bc2[0] = block_info >> 24 & 15
-            bc2[1] = block_info >> 16 & 15
-            bc2[2] = block_info >> 8 & 15
-            bc2 = [(x << 4) + x for x in bc2]
-        else:
-            bc1[0] = block_info >> 27 & 31
-            bc1[1] = block_info >> 19 & 31
-            bc1[2] = block_info >> 11 & 31
-            bc2[0] = block_info >> 24 & 7
-            bc2[1] = block_info >> 16 & 7
-            bc2[2] = block_info >> 8 & 7
-            bc2 = [x + ((y > 3) and (y - 8) or y) for x, y in zip(bc1, bc2)]
-            bc1 = [(x >> 2) + (x << 3) for x in bc1]
-            bc2 = [(x >> 2) + (x << 3) for x in bc2]
-        flip = block_info & 1
-        tcw1 = block_info >> 5 & 7
-        tcw2 = block_info >> 2 & 7
-        for i in range(16):
-            mi = ((pixel_indices >> i) & 1) + ((pixel_indices >> (i + 15)) & 2)
-            c = None
-            if flip == 0 and i < 8 or flip != 0 and (i // 2 % 2) == 0:
-                m = modifier_tables[tcw1][mi]
-                c = [max(0, min(255, x + m)) for x in bc1]
-            else:
-                m = modifier_tables[tcw2][mi]
-                c = [max(0, min(255, x + m)) for x in bc2]
-            if i < 8:
-                c.append(((alpha_part1 >> (i * 4)) & 15) * 17)
-            else:
-                c.append(((alpha_part2 >> ((i - 8) * 4)) & 15) * 17)
-            offset = block_index % 4
-            x = (block_index - offset) % (width // 2) * 2
-            y = (block_index - offset) // (width // 2) * 8
-            if offset & 1:
-                x += 4
-            if offset & 2:
-                y += 4
-            x += i // 4
-            y += i % 4
-            new[x + y * width] = array.array('I', bytes(c))[0]
-        block_index += 1
-    return new.tobytes()
-
-def decode_565(data):
-    data = array.array('H', data)
-    new = bytearray()
-    for i in data:
-        new.append(round((i & 31) * (255 / 31)))
-        new.append(round((i >> 5 & 63) * (255 / 63)))
-        new.append(round((i >> 11 & 31) * (255 / 31)))
-    return bytes(new)
-
-def decode_1555(data):
-    data = array.array('H', data)
-    new = bytearray()
-    for i in data:
-        new.append((i & 1) * 255)
-        new.append(round((i >> 1 & 31) * (255 / 31)))
-        new.append(round((i >> 6 & 31) * (255 / 31)))
-        new.append(round((i >> 11 & 31) * (255 / 31)))
-    return bytes(new)
-
-def decode_4444(data):
-    new = bytearray()
-    for i in data:
-        new.append((i & 15) * 17)
-        new.append((i >> 4) * 17)
-    return bytes(new)
-
-def unpart1by1(n):
-    n &= 0x55555555
-    n = (n ^ (n >> 1)) & 0x33333333
-    n = (n ^ (n >> 2)) & 0x0f0f0f0f
-    n = (n ^ (n >> 4)) & 0x00ff00ff
-    return (n ^ (n >> 8)) & 0x0000ffff
-
-def deinterleave2(n):
-    return unpart1by1(n), unpart1by1(n >> 1)
-
-def deblock(width, size, data):
-    new = bytearray(data)
-    for i in range(len(data)//size):
-        offset = i % 128
-        block = i // 128
-        x, y = deinterleave2(offset)
-        if width >= 16:
-            x += 16 * (block % (width // 16))
-            y += 8 * (block // (width // 16))
-        for j in range(size):
-            new[(x+y*width)*size+j] = data[i*size+j]
-    return bytes(new)
 
 def convert_tex(tex_file, png_file=None, ignore_alpha=False):
     tex = open(tex_file, 'rb')
@@ -190,67 +69,68 @@ def convert_tex(tex_file, png_file=None, ignore_alpha=False):
         png_file = '{}.png'.format(tex_file)
 
     if color_type == 1:
-        image = Image.frombytes('RGBA', (width, height), deblock(width, 4, decode_4444(pixel_data)), 'raw', 'ABGR')
+        image = Image.frombytes('RGBA', (width, height), texdecode.deblock(width, 4, texdecode.decode_4444(pixel_data)), 'raw', 'ABGR')
         if ignore_alpha:
             image = image.convert('RGB')
         image.save(png_file)
     elif color_type == 2:
-        image = Image.frombytes('RGBA', (width, height), deblock(width, 4, decode_1555(pixel_data)), 'raw', 'ABGR')
+        image = Image.frombytes('RGBA', (width, height), texdecode.deblock(width, 4, texdecode.decode_1555(pixel_data)), 'raw', 'ABGR')
         if ignore_alpha:
             image = image.convert('RGB')
         image.save(png_file)
     elif color_type == 3:
-        image = Image.frombytes('RGBA', (width, height), deblock(width, 4, pixel_data), 'raw', 'ABGR')
+        image = Image.frombytes('RGBA', (width, height), texdecode.deblock(width, 4, pixel_data), 'raw', 'ABGR')
         if ignore_alpha:
             image = image.convert('RGB')
         image.save(png_file)
     elif color_type == 4:
-        image = Image.frombytes('RGB', (width, height), deblock(width, 3, decode_565(pixel_data)), 'raw', 'BGR')
+        image = Image.frombytes('RGB', (width, height), texdecode.deblock(width, 3, texdecode.decode_565(pixel_data)), 'raw', 'BGR')
         image.save(png_file)
     elif color_type == 5: # format may not be correct
-        image = Image.frombytes('L', (width, height), deblock(width, 1, pixel_data), 'raw', 'L')
+        image = Image.frombytes('L', (width, height), texdecode.deblock(width, 1, pixel_data), 'raw', 'L')
         image.save(png_file)
     elif color_type == 7:
         pixel_data = array.array('H', pixel_data)
         pixel_data.byteswap()
-        image = Image.frombytes('LA', (width, height), deblock(width, 2, pixel_data.tobytes()), 'raw', 'LA')
+        image = Image.frombytes('LA', (width, height), texdecode.deblock(width, 2, pixel_data.tobytes()), 'raw', 'LA')
         image.save(png_file)
     elif color_type == 11:
-        image = Image.frombytes('RGBA', (width, height), decode_etc1(pixel_data, width), 'raw', 'RGBA')
+        image = Image.frombytes('RGBA', (width, height), texdecode.decode_etc1(pixel_data, width), 'raw', 'RGBA')
         if ignore_alpha:
             image = image.convert('RGB')
         image.save(png_file)
     elif color_type == 12:
-        image = Image.frombytes('RGBA', (width, height), decode_etc1(pixel_data, width, True), 'raw', 'RGBA')
+        image = Image.frombytes('RGBA', (width, height), texdecode.decode_etc1(pixel_data, width, True), 'raw', 'RGBA')
         if ignore_alpha:
             image = image.convert('RGB')
         image.save(png_file)
     elif color_type == 14: # format may not be correct
-        image = Image.frombytes('L', (width, height), deblock(width, 1, decode_4444(pixel_data)), 'raw', 'L')
+        image = Image.frombytes('L', (width, height), texdecode.deblock(width, 1, texdecode.decode_4444(pixel_data)), 'raw', 'L')
         image.save(png_file)
     elif color_type == 15: # format may not be correct
-        image = Image.frombytes('L', (width, height), deblock(width, 1, decode_4444(pixel_data)), 'raw', 'L')
+        image = Image.frombytes('L', (width, height), texdecode.deblock(width, 1, texdecode.decode_4444(pixel_data)), 'raw', 'L')
         image.save(png_file)
     elif color_type == 16: # format may not be correct
-        image = Image.frombytes('L', (width, height), deblock(width, 1, pixel_data), 'raw', 'L')
+        image = Image.frombytes('L', (width, height), texdecode.deblock(width, 1, pixel_data), 'raw', 'L')
         image.save(png_file)
     elif color_type == 17:
-        image = Image.frombytes('RGB', (width, height), deblock(width, 3, pixel_data), 'raw', 'BGR')
+        image = Image.frombytes('RGB', (width, height), texdecode.deblock(width, 3, pixel_data), 'raw', 'BGR')
         image.save(png_file)
     else:
         raise ValueError('unknown texture color type')
 
-parser = argparse.ArgumentParser(description='Convert a TEX file from Monster Hunter 4 Ultimate to an image')
-parser.add_argument('--ignore-alpha', action='store_true', default=False, help='ingore texture alpha channel')
-parser.add_argument('inputfile', help='TEX input file')
-parser.add_argument('outputfile', nargs='?', default=None, help='image output file')
-args = parser.parse_args()
-
-if os.path.isdir(args.inputfile):
-    for dirpath, dirnames, filenames in os.walk(args.inputfile):
-        for filename in filenames:
-            if filename.endswith('.tex'):
-                convert_tex(os.path.join(dirpath, filename), ignore_alpha=args.ignore_alpha)
-else:
-    convert_tex(args.inputfile, args.outputfile, args.ignore_alpha)
-
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert a TEX file from Monster Hunter 4 Ultimate to an image')
+    parser.add_argument('--ignore-alpha', action='store_true', default=False, help='ingore texture alpha channel')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes when converting a directory (default: all cores)')
+    parser.add_argument('--output-path', default=None, help='write files converted from a directory into a mirrored tree under this path')
+    parser.add_argument('--incremental', action='store_true', default=False, help='skip textures unchanged since the last directory conversion and remove outputs of deleted textures')
+    parser.add_argument('inputfile', help='TEX input file or directory')
+    parser.add_argument('outputfile', nargs='?', default=None, help='image output file')
+    args = parser.parse_args()
+
+    if os.path.isdir(args.inputfile):
+        if texbatch.convert_directory(convert_tex, args.inputfile, '.png', args.output_path, args.jobs, args.incremental, ignore_alpha=args.ignore_alpha) != 0:
+            sys.exit(1)
+    else:
+        convert_tex(args.inputfile, args.outputfile, args.ignore_alpha)
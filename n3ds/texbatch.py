@@ -0,0 +1,107 @@
+# Copyright 2015 Seth VanHeulen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import time
+
+
+def find_tex_files(path):
+    tex_files = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for file_name in sorted(filenames):
+            if file_name.endswith('.tex'):
+                tex_file = os.path.join(dirpath, file_name)
+                tex_files.append((tex_file, os.path.relpath(tex_file, path)))
+    return tex_files
+
+def convert_tex_item(item):
+    convert_tex, tex_file, output_file, options = item
+    try:
+        if os.path.dirname(output_file):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        convert_tex(tex_file, output_file, **options)
+    except Exception as error:
+        return tex_file, error
+    return tex_file, None
+
+def hash_file(file_name):
+    return hashlib.sha1(open(file_name, 'rb').read()).hexdigest()
+
+def read_manifest(manifest_file):
+    if not os.path.exists(manifest_file):
+        return {}
+    return json.load(open(manifest_file, 'r'))
+
+def write_manifest(manifest_file, manifest):
+    with open(manifest_file + '.tmp', 'w') as manifest_output:
+        json.dump(manifest, manifest_output, indent=4, sort_keys=True)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+def is_unchanged(entry, tex_file, stat, options, output_file):
+    if entry is None or entry['options'] != options or not os.path.exists(output_file):
+        return False
+    if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+        return True
+    if entry['size'] != stat.st_size or entry['hash'] != hash_file(tex_file):
+        return False
+    entry['mtime'] = stat.st_mtime_ns
+    return True
+
+def convert_directory(convert_tex, input_path, extension, output_path=None, jobs=None, incremental=False, **options):
+    start = time.perf_counter()
+    manifest_path = input_path if output_path is None else output_path
+    manifest_file = os.path.join(manifest_path, '.convert_tex{}.json'.format(extension))
+    manifest = {}
+    if incremental:
+        manifest = read_manifest(manifest_file)
+    items = []
+    names = set()
+    skipped_count = 0
+    for tex_file, name in find_tex_files(input_path):
+        if output_path is None:
+            output_file = tex_file + extension
+        else:
+            output_file = os.path.join(output_path, name + extension)
+        names.add(name)
+        if incremental:
+            stat = os.stat(tex_file)
+            if is_unchanged(manifest.get(name), tex_file, stat, options, output_file):
+                skipped_count += 1
+                continue
+            manifest[name] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': hash_file(tex_file), 'options': options, 'output': os.path.relpath(output_file, manifest_path)}
+        items.append((convert_tex, tex_file, output_file, options))
+    evicted_count = 0
+    for name in sorted(set(manifest) - names):
+        output_file = os.path.join(manifest_path, manifest.pop(name)['output'])
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        evicted_count += 1
+    failed_count = 0
+    if len(items) != 0:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            for tex_file, error in executor.map(convert_tex_item, items, chunksize=16):
+                if error is not None:
+                    print('failed: {}, error: {}'.format(tex_file, error))
+                    manifest.pop(os.path.relpath(tex_file, input_path), None)
+                    failed_count += 1
+    if incremental:
+        write_manifest(manifest_file, manifest)
+    elapsed = time.perf_counter() - start
+    print('converted: {}, skipped: {}, evicted: {}, failed: {}, time: {:.3f}s, files/s: {:.1f}'.format(len(items) - failed_count, skipped_count, evicted_count, failed_count, elapsed, (len(items) + skipped_count) / max(elapsed, 1e-9)))
+    return failed_count
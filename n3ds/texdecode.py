@@ -0,0 +1,144 @@
+# Copyright 2015 Seth VanHeulen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import functools
+
+import numpy
+
+
+modifier_tables = numpy.array([
+    (2, 8, -2, -8),
+    (5, 17, -5, -17),
+    (9, 29, -9, -29),
+    (13, 42, -13, -42),
+    (18, 60, -18, -60),
+    (24, 80, -24, -80),
+    (33, 106, -33, -106),
+    (47, 183, -47, -183)
+], dtype=numpy.int16)
+
+# modifier_tables repeated over the 4 channels of a palette entry
+palette_modifiers = numpy.repeat(modifier_tables[:,:,None], 4, axis=2)
+
+block_pixels = numpy.arange(16, dtype=numpy.uint32)
+
+# palette offset of the sub-block each pixel of a 4x4 block uses, without and with the flip bit
+subblock_patterns = numpy.array([block_pixels >= 8, block_pixels // 2 % 2 == 1], dtype=numpy.uint8) * 4
+
+scale_5bit = numpy.array([round(x * (255 / 31)) for x in range(32)], dtype=numpy.uint8)
+scale_6bit = numpy.array([round(x * (255 / 63)) for x in range(64)], dtype=numpy.uint8)
+
+# half_byte_table[x] == [(x & 15) * 17, (x >> 4) * 17]
+half_byte_table = numpy.array([[(x & 15) * 17, (x >> 4) * 17] for x in range(256)], dtype=numpy.uint8)
+
+@functools.lru_cache(maxsize=32)
+def get_etc1_index_map(width, block_count):
+    block = numpy.arange(block_count)
+    offset = block % 4
+    x = (block - offset) % (width // 2) * 2 + (offset & 1) * 4
+    y = (block - offset) // (width // 2) * 8 + (offset & 2) * 2
+    index_map = (x[:,None] + block_pixels // 4) + (y[:,None] + block_pixels % 4) * width
+    index_map.flags.writeable = False
+    return index_map
+
+def decode_etc1(data, width, alpha=False, reverse=False):
+    data = numpy.frombuffer(data, dtype=numpy.uint32).reshape(-1, 4 if alpha else 2)
+    pixel_count = len(data) * 16
+    block_info = data[:,-1]
+    shifts = numpy.array([28, 20, 12, 1, 24, 16, 8, 1], dtype=numpy.uint32)
+    if reverse:
+        shifts = shifts[[3, 2, 1, 0, 7, 6, 5, 4]]
+    individual = (block_info[:,None] >> shifts & 15).astype(numpy.int16)
+    individual += individual << 4
+    differential = (block_info[:,None] >> shifts - 1 & 31).astype(numpy.int16)
+    differential[:,4:] = differential[:,:4] + ((block_info[:,None] >> shifts[4:] & 7).astype(numpy.int16) ^ 4) - 4
+    differential = (differential >> 2) + (differential << 3)
+    base_colors = numpy.where((block_info[:,None] & 2) == 0, individual, differential).reshape(-1, 2, 1, 4)
+    base_colors[:,:,:,0 if reverse else 3] = 0
+    # each block has 8 possible colors, one per sub-block and modifier
+    palette = numpy.repeat(base_colors, 4, axis=2)
+    palette += palette_modifiers[numpy.stack([block_info >> 5 & 7, block_info >> 2 & 7], axis=1)]
+    palette = palette.clip(0, 255, out=palette).astype(numpy.uint8)
+    bits = numpy.unpackbits(data[:,-2].astype('<u4').view(numpy.uint8).reshape(-1, 4), axis=1, bitorder='little')
+    palette_index = bits[:,:16] | bits[:,16:] << 1
+    palette_index |= subblock_patterns[block_info & 1]
+    palette_index = palette_index + numpy.arange(0, len(data) * 8, 8, dtype=numpy.uint32)[:,None]
+    pixels = palette.view(numpy.uint32).ravel()[palette_index]
+    alpha_values = pixels.view(numpy.uint8).reshape(-1, 16, 4)[:,:,0 if reverse else 3]
+    if alpha:
+        alpha_bytes = data[:,:2].astype('<u4').view(numpy.uint8)
+        nibbles = numpy.empty((len(data), 8, 2), dtype=numpy.uint8)
+        numpy.bitwise_and(alpha_bytes, 15, out=nibbles[:,:,0])
+        numpy.right_shift(alpha_bytes, 4, out=nibbles[:,:,1])
+        nibbles *= 17
+        alpha_values[:] = nibbles.reshape(-1, 16)
+    else:
+        alpha_values[:] = 255
+    new = numpy.arange(pixel_count, dtype=numpy.uint32)
+    new[get_etc1_index_map(width, len(data)).ravel()] = pixels.ravel()
+    return new.tobytes()
+
+def decode_565(data):
+    data = numpy.frombuffer(data, dtype=numpy.uint16)
+    new = numpy.empty((len(data), 3), dtype=numpy.uint8)
+    new[:,0] = scale_5bit[data & 31]
+    new[:,1] = scale_6bit[data >> 5 & 63]
+    new[:,2] = scale_5bit[data >> 11 & 31]
+    return new.tobytes()
+
+def decode_1555(data):
+    data = numpy.frombuffer(data, dtype=numpy.uint16)
+    new = numpy.empty((len(data), 4), dtype=numpy.uint8)
+    new[:,0] = (data & 1) * 255
+    new[:,1] = scale_5bit[data >> 1 & 31]
+    new[:,2] = scale_5bit[data >> 6 & 31]
+    new[:,3] = scale_5bit[data >> 11 & 31]
+    return new.tobytes()
+
+def decode_4444(data):
+    return half_byte_table[numpy.frombuffer(data, dtype=numpy.uint8)].tobytes()
+
+def unpart1by1(n):
+    n = n & 0x55555555
+    n = (n ^ (n >> 1)) & 0x33333333
+    n = (n ^ (n >> 2)) & 0x0f0f0f0f
+    n = (n ^ (n >> 4)) & 0x00ff00ff
+    return (n ^ (n >> 8)) & 0x0000ffff
+
+def deinterleave2(n):
+    return unpart1by1(n), unpart1by1(n >> 1)
+
+@functools.lru_cache(maxsize=32)
+def get_deblock_map(width, pixel_count):
+    index = numpy.arange(pixel_count)
+    x, y = deinterleave2(index % 128)
+    if width >= 16:
+        block = index // 128
+        x += 16 * (block % (width // 16))
+        y += 8 * (block // (width // 16))
+    new_index = x + y * width
+    if pixel_count != 0 and new_index.max() >= pixel_count:
+        raise IndexError('deblock: pixel out of range')
+    # textures narrower than a tile write several pixels to the same place, the last one wins
+    new_index, last = numpy.unique(new_index[::-1], return_index=True)
+    deblock_map = numpy.arange(pixel_count)
+    deblock_map[new_index] = pixel_count - 1 - last
+    deblock_map.flags.writeable = False
+    return deblock_map
+
+def deblock(width, size, data):
+    pixel_count = len(data) // size
+    pixels = numpy.frombuffer(data, dtype=numpy.uint8, count=pixel_count * size).reshape(pixel_count, size)
+    return pixels.take(get_deblock_map(width, pixel_count), axis=0).tobytes() + bytes(data[pixel_count * size:])